@@ -0,0 +1,111 @@
+"""
+Throughput benchmark for the LF API client.
+
+Starts a local stand-in for /api/com-return/by-heatid that serves the same
+header-less CSV format, then compares one-at-a-time get_lf_data calls with
+the pooled, concurrent get_lf_data_many.
+
+Example:
+    python benchmark-lf-api.py --heats 200 --workers 16 --latency-ms 50
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_api_module():
+    spec = importlib.util.spec_from_file_location(
+        'lf_api', os.path.join(SCRIPT_DIR, 'get-LF-data-from-api.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_csv_body(heat_id, n_rows):
+    """Build a header-less CSV body with the 32 API columns."""
+    lines = []
+    for i in range(n_rows):
+        chem = ','.join(f"{random.uniform(0, 0.5):.4f}" for _ in range(24))
+        lines.append(
+            f"{i},2026-01-05 08:{i % 60:02d}:00,{i % 30},{heat_id},SAE1006-Al,LF,"
+            f"{random.uniform(1540, 1620):.1f},S{i},{chem}"
+        )
+    return '\n'.join(lines).encode('utf-8')
+
+
+def start_stub_server(rows_per_heat, latency_s, fail_rate):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            heat_id = query.get('heatID', [''])[0]
+            time.sleep(latency_s)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = make_csv_body(heat_id, rows_per_heat)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark get_lf_data vs get_lf_data_many against a local stub API.")
+    parser.add_argument("--heats", type=int, default=200, help="Number of heat IDs to fetch")
+    parser.add_argument("--rows", type=int, default=12, help="CSV rows returned per heat")
+    parser.add_argument("--workers", type=int, default=16, help="max_workers for get_lf_data_many")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated server latency per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    args = parser.parse_args()
+
+    lf_api = load_api_module()
+    server = start_stub_server(args.rows, args.latency_ms / 1000.0, args.fail_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/com-return/by-heatid"
+    heat_ids = [f"B26{i:05d}" for i in range(args.heats)]
+    print(f"Stub API at {url} ({args.latency_ms} ms latency, {args.rows} rows/heat, fail rate {args.fail_rate})")
+
+    # Baseline: one heat at a time, new connection per call
+    start = time.perf_counter()
+    sequential_rows = 0
+    for heat_id in heat_ids:
+        df = lf_api.get_lf_data(heat_id, url=url)
+        if df is not None:
+            sequential_rows += len(df)
+    sequential_s = time.perf_counter() - start
+
+    # Bulk: pooled session, concurrent requests
+    start = time.perf_counter()
+    data, status = lf_api.get_lf_data_many(heat_ids, max_workers=args.workers, url=url)
+    bulk_s = time.perf_counter() - start
+
+    server.shutdown()
+
+    print(f"\n{'Mode':<30} {'Seconds':>10} {'Heats/s':>10} {'Rows':>10}")
+    print("-" * 64)
+    print(f"{'get_lf_data (sequential)':<30} {sequential_s:>10.2f} {args.heats / sequential_s:>10.1f} {sequential_rows:>10}")
+    print(f"{'get_lf_data_many':<30} {bulk_s:>10.2f} {args.heats / bulk_s:>10.1f} {len(data):>10}")
+    print(f"\nSpeedup: {sequential_s / bulk_s:.1f}x")
+    print(f"Columns: {data.shape[1]}")
+    print("Status counts:")
+    print(status['status'].value_counts().to_string())
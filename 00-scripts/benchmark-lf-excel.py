@@ -0,0 +1,136 @@
+"""
+Benchmark process_file (pd.read_excel) against process_file_fast (streaming reader).
+
+Each reader runs in a fresh process so peak memory is measured independently.
+Without input files a synthetic LF workbook with the real 59-column layout is generated.
+
+Example:
+    python benchmark-lf-excel.py --rows 20000
+    python benchmark-lf-excel.py ../01-data/LF/25.12.LF2.xlsx
+"""
+
+import argparse
+import datetime
+import importlib.util
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import threading
+import time
+
+import psutil
+from openpyxl import Workbook
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_loader_module():
+    spec = importlib.util.spec_from_file_location(
+        'load_lf_excel', os.path.join(SCRIPT_DIR, 'load-lf-excel.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_workbook(path, n_rows, seed=0):
+    """Write a synthetic LF workbook: 4 header rows, then n_rows of 59 columns."""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('LF')
+    for i in range(4):
+        ws.append([f'header {i}'] + [None] * 58)
+    for i in range(n_rows):
+        row = [
+            i + 1, float(i % 31 + 1), rnd.choice(['1A', '1B', '2A']),
+            f'B{6000 + i}' if i % 50 else None,
+            rnd.choice(['SAE1006-Al', 'SAE1006-Al', 'SAE1008', 'Q235']),
+            datetime.time(8, 30), datetime.time(8, 35), datetime.time(9, 2), datetime.time(9, 16),
+            rnd.choice([6.0, 7.0, 'a']),
+        ]
+        row += [round(rnd.uniform(0, 1600), 3) for _ in range(27)]
+        row += ['00:30', rnd.uniform(0, 5000)]
+        row += [rnd.uniform(0, 0.1) for _ in range(7)]
+        row += [rnd.uniform(1500, 1650) for _ in range(5)]
+        row += ['NOI THAN', None, datetime.time(10, 6), datetime.time(10, 14), 8.0, 'DEN', 'BINH THUONG', None]
+        ws.append(row)
+    wb.save(path)
+
+
+def _run_reader(reader, files, queue):
+    """Child process: run one reader over all files, report time, rows and peak RSS."""
+    loader = load_loader_module()
+    if reader == 'stream-openpyxl':
+        loader.CalamineWorkbook = None
+    func = loader.process_file if reader == 'pandas' else loader.process_file_fast
+
+    proc = psutil.Process()
+    baseline = proc.memory_info().rss
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], proc.memory_info().rss)
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    rows = 0
+    for path in files:
+        df = func(path)
+        rows += 0 if df is None else len(df)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    queue.put((elapsed, rows, (peak[0] - baseline) / 1024 ** 2))
+
+
+def run_isolated(reader, files):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_reader, args=(reader, files, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LF Excel readers: rows/sec and peak memory.")
+    parser.add_argument("input_files", nargs="*", help="LF workbooks (default: generate a synthetic one)")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows in the synthetic workbook")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    files = args.input_files
+    if not files:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, '25.12.LF2.xlsx')
+        print(f"Generating synthetic workbook with {args.rows} rows...")
+        make_workbook(path, args.rows)
+        files = [path]
+
+    total_bytes = sum(os.path.getsize(f) for f in files)
+    print(f"Input: {len(files)} file(s), {total_bytes / 1024 ** 2:.1f} MB")
+
+    readers = ['pandas', 'stream-openpyxl']
+    if load_loader_module().CalamineWorkbook is not None:
+        readers.append('stream-calamine')
+
+    results = {reader: run_isolated(reader, files) for reader in readers}
+
+    print(f"\n{'Reader':<18} {'Seconds':>10} {'Rows out':>10} {'Input rows/s':>14} {'Peak MB':>10}")
+    print("-" * 66)
+    input_rows = args.rows if tmp_dir else None
+    for reader, (elapsed, rows, peak_mb) in results.items():
+        rate = f"{input_rows / elapsed:,.0f}" if input_rows else 'n/a'
+        print(f"{reader:<18} {elapsed:>10.2f} {rows:>10} {rate:>14} {peak_mb:>10.1f}")
+
+    base = results['pandas'][0]
+    for reader in readers[1:]:
+        print(f"Speedup {reader}: {base / results[reader][0]:.1f}x")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
@@ -1,70 +1,149 @@
 import requests
 import pandas as pd
+import argparse
+import hashlib
 import io
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_lf_data(heat_id):
+API_URL = "http://10.192.47.100:61000/api/com-return/by-heatid"
+
+# Define column names based on the data structure provided
+# The API returns CSV data without a header row.
+LF_API_COLUMNS = [
+    'id',           # 0
+    'cr_time',      # 1
+    'SOTHUNG',      # 2
+    'heatID',       # 3
+    'MACTHEP',      # 4
+    'CONGDOAN',     # 5
+    'NHIETDO',      # 6
+    'Sample_ID',    # 7
+    'C_tp',         # 8
+    'Si_tp',        # 9
+    'Mn_tp',        # 10
+    'P_tp',         # 11
+    'S_tp',         # 12
+    'Cr_tp',        # 13
+    'Mo_tp',        # 14
+    'Ni_tp',        # 15
+    'Al_tp',        # 16
+    'Co_tp',        # 17
+    'Cu_tp',        # 18
+    'Nb_tp',        # 19
+    'Ti_tp',        # 20
+    'V_tp',         # 21
+    'W_tp',         # 22
+    'Pb_tp',        # 23
+    'Sb_tp',        # 24
+    'B_tp',         # 25
+    'N_tp',         # 26
+    'Fe_tp',        # 27
+    'CEV_tp',       # 28
+    'Altot_tp',     # 29
+    'Alins_tp',     # 30
+    'Alsol_tp'      # 31
+]
+
+# Identifier / timestamp columns; every other column is numeric
+LF_API_TEXT_COLUMNS = ['cr_time', 'SOTHUNG', 'heatID', 'MACTHEP', 'CONGDOAN', 'Sample_ID']
+
+# Per-heat status columns returned by get_lf_data_many
+STATUS_COLUMNS = ['heatID', 'status', 'source', 'rows', 'elapsed_s', 'error']
+
+CHECKPOINT_FILE = '_checkpoint.json'
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """
+    Creates a requests.Session with a pooled connection adapter that retries
+    transient errors (connection resets, 429 and 5xx responses) with exponential backoff.
+
+    Args:
+        pool_size (int): Maximum number of keep-alive connections kept in the pool.
+        retries (int): Maximum number of retries per request.
+        backoff_factor (float): Backoff factor in seconds (0.5 -> 0.5s, 1s, 2s, ...).
+
+    Returns:
+        requests.Session: Session to pass to get_lf_data / get_lf_data_many.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _fetch_lf_frame(heat_id, session=None, url=API_URL, timeout=30):
+    """Fetch and parse one heat. Raises on HTTP or parsing errors."""
+    http = session if session is not None else requests
+    response = http.get(url, params={'heatID': heat_id}, timeout=timeout)
+    response.raise_for_status()
+
+    # Read CSV data from the response content
+    # Check if response is empty
+    if not response.text.strip():
+        return pd.DataFrame(columns=LF_API_COLUMNS)
+
+    return pd.read_csv(io.StringIO(response.text), header=None, names=LF_API_COLUMNS)
+
+
+def get_lf_data(heat_id, session=None, url=API_URL, cache=None):
     """
     Fetches LF data from the API for a given heat ID and returns it as a pandas DataFrame.
-    
+
     Args:
         heat_id (str): The heat ID to fetch data for.
-        
+        session (requests.Session, optional): Session to reuse pooled connections.
+        url (str): API endpoint.
+        cache (LFResponseCache, optional): On-disk cache checked before the API
+            and filled after a successful fetch (see lf_api_cache.py).
+
     Returns:
         pd.DataFrame: DataFrame containing the fetched data.
     """
-    url = "http://10.192.47.100:61000/api/com-return/by-heatid"
-    params = {'heatID': heat_id}
-    
-    # Define column names based on the data structure provided
-    # The API returns CSV data without a header row.
-    columns = [
-        'id',           # 0
-        'cr_time',      # 1
-        'SOTHUNG',      # 2
-        'heatID',       # 3
-        'MACTHEP',      # 4
-        'CONGDOAN',     # 5
-        'NHIETDO',      # 6
-        'Sample_ID',    # 7
-        'C_tp',         # 8
-        'Si_tp',        # 9
-        'Mn_tp',        # 10
-        'P_tp',         # 11
-        'S_tp',         # 12
-        'Cr_tp',        # 13
-        'Mo_tp',        # 14
-        'Ni_tp',        # 15
-        'Al_tp',        # 16
-        'Co_tp',        # 17
-        'Cu_tp',        # 18
-        'Nb_tp',        # 19
-        'Ti_tp',        # 20
-        'V_tp',         # 21
-        'W_tp',         # 22
-        'Pb_tp',        # 23
-        'Sb_tp',        # 24
-        'B_tp',         # 25
-        'N_tp',         # 26
-        'Fe_tp',        # 27
-        'CEV_tp',       # 28
-        'Altot_tp',     # 29
-        'Alins_tp',     # 30
-        'Alsol_tp'      # 31
-    ]
-    
+    if cache is not None:
+        df = cache.get(heat_id)
+        if df is not None:
+            return df
+
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        # Read CSV data from the response content
-        # Check if response is empty
-        if not response.text.strip():
+        df = _fetch_lf_frame(heat_id, session=session, url=url)
+        if df.empty:
             print(f"No data returned for heat ID: {heat_id}")
-            return pd.DataFrame(columns=columns)
-
-        df = pd.read_csv(io.StringIO(response.text), header=None, names=columns)
+        if cache is not None:
+            cache.put(heat_id, df)
         return df
-        
+
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data: {e}")
         return None
@@ -72,18 +151,224 @@ def get_lf_data(heat_id):
         print(f"Error parsing CSV data: {e}")
         return None
 
+
+def get_lf_data_many(heat_ids, max_workers=8, session=None, url=API_URL, timeout=30, cache=None,
+                     rate_limit=None):
+    """
+    Fetches LF data for many heat IDs concurrently over one pooled session.
+
+    At most `max_workers` requests are in flight at any time. Transient errors are
+    retried with backoff by the session adapter (see make_session).
+
+    Args:
+        heat_ids (iterable of str): Heat IDs to fetch. Duplicates are fetched once.
+        max_workers (int): Number of concurrent requests.
+        session (requests.Session, optional): Session to use. A pooled session sized
+            to `max_workers` is created (and closed) when omitted.
+        url (str): API endpoint.
+        timeout (float): Per-request timeout in seconds.
+        cache (LFResponseCache, optional): Heats found in the cache are not requested.
+        rate_limit (float, optional): Maximum API requests per second.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The concatenated data (LF_API_COLUMNS) and
+        one status row per heat ('ok', 'empty' or 'error') with its source ('cache'
+        or 'api'), row count, elapsed time and error message.
+    """
+    heat_ids = list(dict.fromkeys(heat_ids))
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_size=max_workers)
+
+    def fetch(heat_id):
+        start = time.perf_counter()
+        df, error, source = None, None, 'api'
+        if cache is not None:
+            df = cache.get(heat_id)
+        if df is not None:
+            source = 'cache'
+            status = 'ok' if not df.empty else 'empty'
+        else:
+            try:
+                if limiter is not None:
+                    limiter.wait()
+                df = _fetch_lf_frame(heat_id, session=session, url=url, timeout=timeout)
+                status = 'ok' if not df.empty else 'empty'
+                if cache is not None:
+                    cache.put(heat_id, df)
+            except (requests.exceptions.RequestException, pd.errors.ParserError) as e:
+                status, error = 'error', str(e)
+        return df, {
+            'heatID': heat_id,
+            'status': status,
+            'source': source,
+            'rows': 0 if df is None else len(df),
+            'elapsed_s': time.perf_counter() - start,
+            'error': error,
+        }
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fetch, heat_ids))
+    finally:
+        if own_session:
+            session.close()
+
+    frames = [df for df, _ in results if df is not None and not df.empty]
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LF_API_COLUMNS)
+    status = pd.DataFrame([s for _, s in results], columns=STATUS_COLUMNS)
+    return data, status
+
+
+def normalize_lf_frame(df):
+    """Cast API frames to a fixed schema (text columns as string, the rest float64)."""
+    df = df.reindex(columns=LF_API_COLUMNS).copy()
+    numeric_cols = [c for c in LF_API_COLUMNS if c not in LF_API_TEXT_COLUMNS]
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+    df[LF_API_TEXT_COLUMNS] = df[LF_API_TEXT_COLUMNS].astype('string')
+    return df
+
+
+def expand_heat_range(first, last):
+    """
+    Expand an inclusive heat ID range sharing the same prefix.
+    Example: ('B2600510', 'B2600512') -> ['B2600510', 'B2600511', 'B2600512']
+    """
+    m_first = re.match(r'^(.*?)(\d+)$', first)
+    m_last = re.match(r'^(.*?)(\d+)$', last)
+    if not m_first or not m_last or m_first.group(1) != m_last.group(1):
+        raise ValueError(f"Heat IDs '{first}' and '{last}' do not share a prefix followed by a number")
+    prefix, width = m_first.group(1), len(m_first.group(2))
+    start, stop = int(m_first.group(2)), int(m_last.group(2))
+    return [f"{prefix}{n:0{width}d}" for n in range(start, stop + 1)]
+
+
+def backfill_lf_data(heat_ids, store_dir, batch_size=200, max_workers=8, rate_limit=20.0,
+                     url=API_URL, cache=None):
+    """
+    Fetches many heats batch by batch into an append-only Parquet store.
+
+    Each batch is written as `data/part-<offset>.parquet` (plus `status/part-<offset>.parquet`),
+    named after the position of its first heat, then `_checkpoint.json` records the
+    next offset. Re-running with the same heat list resumes after the last completed
+    batch, also with a different batch_size; a batch interrupted before its checkpoint
+    is simply rewritten. Only one batch is held in memory at a time.
+    Read the result with pd.read_parquet(os.path.join(store_dir, 'data')).
+
+    Args:
+        heat_ids (list of str): Heat IDs to fetch, in order.
+        store_dir (str): Output directory.
+        batch_size (int): Heats per batch / part file.
+        max_workers (int): Concurrent requests per batch.
+        rate_limit (float): Maximum API requests per second.
+        url (str): API endpoint.
+        cache (LFResponseCache, optional): Response cache passed to get_lf_data_many.
+
+    Returns:
+        dict: The final checkpoint.
+    """
+    heat_ids = list(dict.fromkeys(heat_ids))
+    job = hashlib.sha1('\n'.join(heat_ids).encode('utf-8')).hexdigest()
+    for sub_dir in ('data', 'status'):
+        os.makedirs(os.path.join(store_dir, sub_dir), exist_ok=True)
+    checkpoint_path = os.path.join(store_dir, CHECKPOINT_FILE)
+
+    checkpoint = {'job': job, 'next_offset': 0, 'rows': 0, 'errors': 0}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+        if saved.get('job') != job:
+            raise ValueError(f"{store_dir} holds a backfill of a different heat list; use a new --store directory")
+        checkpoint = saved
+        print(f"Resuming backfill at heat {checkpoint['next_offset']}/{len(heat_ids)}")
+
+    session = make_session(pool_size=max_workers)
+    try:
+        for offset in range(checkpoint['next_offset'], len(heat_ids), batch_size):
+            batch = heat_ids[offset:offset + batch_size]
+            # Named by start offset: a resume with another batch_size never overwrites finished parts
+            part = f"part-{offset:09d}.parquet"
+            data, status = get_lf_data_many(batch, max_workers=max_workers, session=session,
+                                            url=url, cache=cache, rate_limit=rate_limit)
+
+            if not data.empty:
+                normalize_lf_frame(data).to_parquet(os.path.join(store_dir, 'data', part), index=False)
+            status.astype({'heatID': 'string', 'status': 'string', 'source': 'string',
+                           'error': 'string'}).to_parquet(os.path.join(store_dir, 'status', part), index=False)
+
+            checkpoint['next_offset'] = offset + len(batch)
+            checkpoint['rows'] += len(data)
+            checkpoint['errors'] += int((status['status'] == 'error').sum())
+            tmp_path = checkpoint_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(checkpoint, f)
+            os.replace(tmp_path, checkpoint_path)
+
+            print(f"  -> {checkpoint['next_offset']}/{len(heat_ids)} heats, "
+                  f"{checkpoint['rows']} rows, {checkpoint['errors']} errors")
+    finally:
+        session.close()
+
+    return checkpoint
+
+
+def failed_heats(store_dir):
+    """List heat IDs whose last fetch in a backfill store ended with an error."""
+    status_dir = os.path.join(store_dir, 'status')
+    if not os.path.isdir(status_dir) or not os.listdir(status_dir):
+        return []
+    status = pd.read_parquet(status_dir, columns=['heatID', 'status'])
+    return status.loc[status['status'] == 'error', 'heatID'].tolist()
+
+
 if __name__ == "__main__":
-    # Test with the example heat ID provided
-    test_heat_id = "B2600511"
-    print(f"Fetching data for heat ID: {test_heat_id}...")
-    df = get_lf_data(test_heat_id)
-    
-    if df is not None and not df.empty:
-        print("Data fetched successfully!")
+    parser = argparse.ArgumentParser(description="Fetch LF data from the API, or backfill many heats into a Parquet store.")
+    parser.add_argument("heat_ids", nargs="*", help="Heat IDs to fetch (default: B2600511)")
+    parser.add_argument("--range", nargs=2, metavar=("FIRST", "LAST"), help="Inclusive heat ID range, e.g. B2600500 B2600900")
+    parser.add_argument("--ids-file", help="Text file with one heat ID per line")
+    parser.add_argument("--store", help="Backfill into this directory (Parquet parts + checkpoint, resumable)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Heats per batch / checkpoint")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, default=20.0, help="Maximum requests per second")
+    parser.add_argument("--cache-dir", help="Response cache directory (default: 01-data/LF API/cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API, without the response cache")
+    args = parser.parse_args()
+
+    from lf_api_cache import DEFAULT_CACHE_DIR, LFResponseCache
+    cache = None if args.no_cache else LFResponseCache(args.cache_dir or DEFAULT_CACHE_DIR)
+
+    heat_ids = list(args.heat_ids)
+    if args.range:
+        heat_ids += expand_heat_range(*args.range)
+    if args.ids_file:
+        with open(args.ids_file) as f:
+            heat_ids += [line.strip() for line in f if line.strip()]
+
+    if args.store:
+        if not heat_ids:
+            parser.error("--store needs heat IDs, --range or --ids-file")
+        print(f"Backfilling {len(heat_ids)} heats into {args.store}...")
+        checkpoint = backfill_lf_data(heat_ids, args.store, batch_size=args.batch_size,
+                                      max_workers=args.workers, rate_limit=args.rate, cache=cache)
+        print(f"Done: {checkpoint['rows']} rows, {checkpoint['errors']} failed heats.")
+    elif len(heat_ids) > 1:
+        print(f"Fetching data for {len(heat_ids)} heat IDs...")
+        df, status = get_lf_data_many(heat_ids, max_workers=args.workers, rate_limit=args.rate, cache=cache)
         print(f"Shape: {df.shape}")
-        print("\nFirst 5 rows:")
-        print(df.head())
-        print("\nColumns:")
-        print(df.columns.tolist())
+        print(status['status'].value_counts().to_string())
     else:
-        print("Failed to fetch data or data is empty.")
\ No newline at end of file
+        # Test with the example heat ID provided
+        test_heat_id = heat_ids[0] if heat_ids else "B2600511"
+        print(f"Fetching data for heat ID: {test_heat_id}...")
+        df = get_lf_data(test_heat_id, cache=cache)
+
+        if df is not None and not df.empty:
+            print("Data fetched successfully!")
+            print(f"Shape: {df.shape}")
+            print("\nFirst 5 rows:")
+            print(df.head())
+            print("\nColumns:")
+            print(df.columns.tolist())
+        else:
+            print("Failed to fetch data or data is empty.")
@@ -0,0 +1,174 @@
+"""
+Persistent on-disk cache for LF API responses.
+
+Parsed frames are stored as one gzip-compressed pickle per heatID (a few KB per
+heat with dtypes preserved; Parquet metadata alone is ~20 KB for frames this
+small). A small SQLite index keeps fetch/access times and file sizes so that:
+- closed heats (last measurement older than `closed_after`) never expire,
+- open heats expire after `open_ttl` seconds and are fetched again,
+- the cache stays under `max_bytes` by evicting least-recently-used heats.
+
+Usage:
+    cache = LFResponseCache()
+    df = get_lf_data('B2600511', cache=cache)
+    print(cache.stats)
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', 'LF API', 'cache')
+# cr_time from the API is plant local time without an offset
+PLANT_TIMEZONE = 'Asia/Ho_Chi_Minh'
+
+
+class LFResponseCache:
+    """Size-bounded LRU cache of LF API frames keyed by heatID."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 ** 2,
+                 open_ttl=3600, closed_after=24 * 3600, timezone=PLANT_TIMEZONE):
+        """
+        Args:
+            cache_dir (str): Directory holding the cached frames and the index.
+            max_bytes (int): Upper bound on the total size of cached files.
+            open_ttl (float): Seconds before an open heat is fetched again.
+            closed_after (float): A heat whose latest `cr_time` is older than this
+                many seconds is considered closed and never expires.
+            timezone (str): Time zone of naive `cr_time` values.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.closed_after = closed_after
+        self.timezone = timezone
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        self._lock = threading.RLock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " heat_id TEXT PRIMARY KEY, file TEXT, bytes INTEGER,"
+            " fetched_at REAL, last_access REAL, closed INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._db.commit()
+
+    def _path(self, file_name):
+        return os.path.join(self.cache_dir, file_name)
+
+    def _is_closed(self, df, now):
+        if df.empty or 'cr_time' not in df.columns:
+            return False
+        last_time = pd.to_datetime(df['cr_time'], errors='coerce').max()
+        if pd.isna(last_time):
+            return False
+        if last_time.tzinfo is None:
+            # .timestamp() of a naive time assumes UTC: localize to the plant's time zone first
+            last_time = last_time.tz_localize(self.timezone, ambiguous='NaT', nonexistent='NaT')
+            if pd.isna(last_time):
+                return False
+        return now - last_time.timestamp() > self.closed_after
+
+    def get(self, heat_id):
+        """Return the cached frame for `heat_id`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file, fetched_at, closed FROM entries WHERE heat_id = ?", (heat_id,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            file_name, fetched_at, closed = row
+            if not closed and now - fetched_at > self.open_ttl:
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                self._remove(heat_id, file_name)
+                self._db.commit()
+                return None
+
+            try:
+                df = pd.read_pickle(self._path(file_name), compression='gzip')
+            except (OSError, EOFError, pickle.UnpicklingError):
+                # File removed or corrupted outside the cache: treat as a miss
+                self.stats['misses'] += 1
+                self._remove(heat_id, file_name)
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE entries SET last_access = ? WHERE heat_id = ?", (now, heat_id))
+            self._db.commit()
+            self.stats['hits'] += 1
+            return df
+
+    def put(self, heat_id, df):
+        """Store the frame for `heat_id`, then evict LRU entries above `max_bytes`."""
+        now = time.time()
+        # Hash of the id: distinct heatIDs never share a file (e.g. 'A/1' and 'A_1')
+        file_name = hashlib.sha256(str(heat_id).encode()).hexdigest()[:32] + '.pkl.gz'
+        with self._lock:
+            tmp_path = self._path(file_name + '.tmp')
+            df.to_pickle(tmp_path, compression='gzip')
+            os.replace(tmp_path, self._path(file_name))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (heat_id, file_name, os.path.getsize(self._path(file_name)), now, now,
+                 int(self._is_closed(df, now))),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _remove(self, heat_id, file_name):
+        self._db.execute("DELETE FROM entries WHERE heat_id = ?", (heat_id,))
+        try:
+            os.remove(self._path(file_name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for heat_id, file_name, size in self._db.execute(
+                "SELECT heat_id, file, bytes FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(heat_id, file_name)
+            total -= size
+            self.stats['evictions'] += 1
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, heat_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM entries WHERE heat_id = ?", (heat_id,)).fetchone() is not None
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def clear(self):
+        """Remove every cached heat."""
+        with self._lock:
+            for heat_id, file_name in self._db.execute("SELECT heat_id, file FROM entries").fetchall():
+                self._remove(heat_id, file_name)
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
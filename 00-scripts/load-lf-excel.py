@@ -1,8 +1,80 @@
 import pandas as pd
+import numpy as np
 import os
 import argparse
+import hashlib
+import json
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
+
+try:
+    # Optional Rust-based reader, ~10x faster than openpyxl on large workbooks
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+MANIFEST_FILE = 'manifest.json'
+
+PARTITION_COLUMNS = ['source_year', 'source_month', 'source_lf']
+
+# Column names of the LF workbook (data starts after 4 header rows)
+LF_COLUMNS = [
+    'stt', 'ngay', 'Ca', 'me_tinh_luyen_so', 'mac_thep_yeu_cau',
+    'thoi_gian_vao_tinh_luyen', 'bat_dau', 'ket_thuc', 'thoi_gian_len_duc',
+    'thung_lf', 'lan_luyen_thu', 'nhiet_do_vao_tl', 'C_truoc', 'Si_truoc',
+    'Mn_truoc', 'S_truoc', 'P_truoc', 'khoi_luong_thung_thep', 'FeSi', 'FeMn',
+    'SiMn', 'than', 'FeCr', 'FeV', 'Niken', 'FeP', 'Cu', 'khac', 'huynh_thach',
+    'nhom_thoi', 'voi_song', 'dolomite', 'quaczit', 'day_feca', 'day_casi',
+    'day_ca_dac', 'xi_bao_on', 'thoi_gian_danh_dien', 'tieu_thu_dien', 'C_sau',
+    'Si_sau', 'Mn_sau', 'S_sau', 'P_sau', 'Al', 'Canxi', 'nhiet_do_lan_1',
+    'nhiet_do_ra_thep', 'nhiet_do_duc_yeu_cau', 'nhiet_do_do_tren_duc',
+    'thoi_gian_dinh_tre', 'ly_do_dinh_tre', 'ghi_chu_1',
+    'thoi_gian_bat_dau_thoi_mem', 'thoi_gian_ket_thu_thoi_mem', 'tong_thoi_gian_thoi_mem',
+    'tinh_trang_xi_lo_thoi_qua_tinh_luyen', 'tinh_trang_xi', 'ghi_chu'
+]
+
+# List of columns that are NOT numeric (identifiers, timestamps, notes)
+NON_NUMERIC_COLUMNS = [
+    'ngay',
+    'Ca',
+    'me_tinh_luyen_so',
+    'mac_thep_yeu_cau',
+    'thoi_gian_vao_tinh_luyen',
+    'bat_dau',
+    'ket_thuc',
+    'thoi_gian_len_duc',
+    # 'thung_lf',
+    # 'Si_truoc',
+    # 'S_truoc',
+    # 'P_truoc',
+    # 'khoi_luong_thung_thep',
+    'thoi_gian_danh_dien',
+    # 'tieu_thu_dien',
+    # 'C_sau',
+    # 'Si_sau',
+    # 'S_sau',
+    # 'P_sau',
+    # 'nhiet_do_lan_1',
+    # 'nhiet_do_duc_yeu_cau',
+    # 'nhiet_do_do_tren_duc',
+    # 'thoi_gian_dinh_tre',
+    'ly_do_dinh_tre',
+    'ghi_chu_1',
+    'thoi_gian_bat_dau_thoi_mem',
+    'thoi_gian_ket_thu_thoi_mem',
+    'tong_thoi_gian_thoi_mem',
+    'tinh_trang_xi_lo_thoi_qua_tinh_luyen',
+    'tinh_trang_xi',
+    'ghi_chu'
+]
+
+# Cell strings that pd.read_excel treats as missing by default
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
 
 
 def parse_filename(filename):
@@ -38,25 +110,9 @@ def process_file(input_path):
     # Parse filename for metadata
     source_year, source_month, source_lf = parse_filename(input_path)
 
-    # Define column names
-    cols = [
-        'stt', 'ngay', 'Ca', 'me_tinh_luyen_so', 'mac_thep_yeu_cau',
-        'thoi_gian_vao_tinh_luyen', 'bat_dau', 'ket_thuc', 'thoi_gian_len_duc',
-        'thung_lf', 'lan_luyen_thu', 'nhiet_do_vao_tl', 'C_truoc', 'Si_truoc',
-        'Mn_truoc', 'S_truoc', 'P_truoc', 'khoi_luong_thung_thep', 'FeSi', 'FeMn',
-        'SiMn', 'than', 'FeCr', 'FeV', 'Niken', 'FeP', 'Cu', 'khac', 'huynh_thach',
-        'nhom_thoi', 'voi_song', 'dolomite', 'quaczit', 'day_feca', 'day_casi',
-        'day_ca_dac', 'xi_bao_on', 'thoi_gian_danh_dien', 'tieu_thu_dien', 'C_sau',
-        'Si_sau', 'Mn_sau', 'S_sau', 'P_sau', 'Al', 'Canxi', 'nhiet_do_lan_1',
-        'nhiet_do_ra_thep', 'nhiet_do_duc_yeu_cau', 'nhiet_do_do_tren_duc',
-        'thoi_gian_dinh_tre', 'ly_do_dinh_tre', 'ghi_chu_1',
-        'thoi_gian_bat_dau_thoi_mem', 'thoi_gian_ket_thu_thoi_mem', 'tong_thoi_gian_thoi_mem',
-        'tinh_trang_xi_lo_thoi_qua_tinh_luyen', 'tinh_trang_xi', 'ghi_chu'
-    ]
-
     try:
         # Read excel file
-        df = pd.read_excel(input_path, skiprows=4, header=None, names=cols)
+        df = pd.read_excel(input_path, skiprows=4, header=None, names=LF_COLUMNS)
         
         # Initial cleanup: drop rows where all elements are NaN
         df = df.dropna(how='all')
@@ -77,42 +133,8 @@ def process_file(input_path):
         df['source_lf'] = source_lf
 
         # --- DATA CLEANING: Force numeric conversion for technical columns ---
-        # List of columns that are NOT numeric (identifiers, timestamps, notes)
-        non_numeric_cols = ['ngay',
-                            'Ca',
-                            'me_tinh_luyen_so',
-                            'mac_thep_yeu_cau',
-                            'thoi_gian_vao_tinh_luyen',
-                            'bat_dau',
-                            'ket_thuc',
-                            'thoi_gian_len_duc',
-                            # 'thung_lf',
-                            # 'Si_truoc',
-                            # 'S_truoc',
-                            # 'P_truoc',
-                            # 'khoi_luong_thung_thep',
-                            'thoi_gian_danh_dien',
-                            # 'tieu_thu_dien',
-                            # 'C_sau',
-                            # 'Si_sau',
-                            # 'S_sau',
-                            # 'P_sau',
-                            # 'nhiet_do_lan_1',
-                            # 'nhiet_do_duc_yeu_cau',
-                            # 'nhiet_do_do_tren_duc',
-                            # 'thoi_gian_dinh_tre',
-                            'ly_do_dinh_tre',
-                            'ghi_chu_1',
-                            'thoi_gian_bat_dau_thoi_mem',
-                            'thoi_gian_ket_thu_thoi_mem',
-                            'tong_thoi_gian_thoi_mem',
-                            'tinh_trang_xi_lo_thoi_qua_tinh_luyen',
-                            'tinh_trang_xi',
-                            'ghi_chu'
-        ]
-        
         # Identify numeric columns (all columns in df that are NOT in the exclusion list)
-        numeric_cols = [c for c in df.columns if c not in non_numeric_cols]
+        numeric_cols = [c for c in df.columns if c not in NON_NUMERIC_COLUMNS]
         
         # Apply numeric conversion to all identified columns
         # errors='coerce' will turn 'a', 'b', 'error' into NaN automatically
@@ -126,23 +148,249 @@ def process_file(input_path):
         print(f"Error processing file {input_path}: {e}")
         return None
 
+def iter_sheet_rows(input_path, first_row=5, n_cols=len(LF_COLUMNS)):
+    """
+    Stream the rows of the first sheet as tuples of exactly `n_cols` values,
+    starting at 1-based row `first_row`. Empty cells are None.
+    Uses python-calamine when installed, otherwise openpyxl in read-only mode.
+    """
+    if CalamineWorkbook is not None:
+        sheet = CalamineWorkbook.from_path(input_path).get_sheet_by_index(0)
+        # iter_rows starts at sheet row 1 but at the first used column
+        pad = [''] * sheet.start[1]
+        for row_number, row in enumerate(sheet.iter_rows(), start=1):
+            if row_number < first_row:
+                continue
+            values = (pad + row)[:n_cols] if pad else row[:n_cols]
+            values = [None if v == '' else v for v in values]
+            yield tuple(values) + (None,) * (n_cols - len(values))
+        return
+
+    wb = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        for row in sheet.iter_rows(min_row=first_row, max_col=n_cols, values_only=True):
+            yield tuple(row) + (None,) * (n_cols - len(row))
+    finally:
+        wb.close()
+
+def _is_missing(value):
+    return value is None or (isinstance(value, str) and value in NA_STRINGS) or (isinstance(value, float) and value != value)
+
+def process_file_fast(input_path):
+    """
+    Streaming version of process_file with the same output columns.
+
+    Rows are filtered (heat number present, grade contains 'SAE1006') while the sheet
+    is streamed, so non-matching rows are never materialised. Column types are
+    declared up front: every column outside NON_NUMERIC_COLUMNS is coerced to float64
+    in a single pd.to_numeric call over the whole numeric block.
+    """
+    if not os.path.exists(input_path):
+        print(f"Warning: File '{input_path}' not found. Skipping.")
+        return None
+
+    print(f"Processing file: {input_path}")
+
+    # Parse filename for metadata
+    source_year, source_month, source_lf = parse_filename(input_path)
+
+    heat_idx = LF_COLUMNS.index('me_tinh_luyen_so')
+    grade_idx = LF_COLUMNS.index('mac_thep_yeu_cau')
+    text_idx = [i for i, c in enumerate(LF_COLUMNS) if c in NON_NUMERIC_COLUMNS]
+    numeric_idx = [i for i, c in enumerate(LF_COLUMNS) if c != 'stt' and c not in NON_NUMERIC_COLUMNS]
+
+    try:
+        rows = [
+            row for row in iter_sheet_rows(input_path)
+            if not _is_missing(row[heat_idx])
+            and isinstance(row[grade_idx], str) and 'SAE1006' in row[grade_idx]
+        ]
+        block = np.empty((len(rows), len(LF_COLUMNS)), dtype=object)
+        if rows:
+            block[:] = rows
+        del rows
+
+        # One vectorized coercion for all numeric columns
+        numeric = pd.to_numeric(pd.Series(block[:, numeric_idx].ravel()), errors='coerce')
+        numeric = numeric.to_numpy(dtype='float64').reshape(len(block), len(numeric_idx))
+        df_numeric = pd.DataFrame(numeric, columns=[LF_COLUMNS[i] for i in numeric_idx])
+
+        df_text = pd.DataFrame(block[:, text_idx], columns=[LF_COLUMNS[i] for i in text_idx])
+        df_text = df_text.mask(df_text.isna() | df_text.isin(NA_STRINGS), np.nan).infer_objects()
+        # Like read_excel, keep whole-number columns without gaps as integers
+        for col in df_text.select_dtypes(include='float').columns:
+            values = df_text[col]
+            if len(values) and values.notna().all() and (values % 1 == 0).all():
+                df_text[col] = values.astype('int64')
+
+        df = pd.concat([df_text, df_numeric], axis=1)[[c for c in LF_COLUMNS if c != 'stt']]
+
+        # Add source metadata columns
+        df['source_year'] = source_year
+        df['source_month'] = source_month
+        df['source_lf'] = source_lf
+
+        print(f"  -> Extracted {len(df)} valid rows. (Year: {source_year}, Month: {source_month}, LF: {source_lf})")
+        return df
+
+    except Exception as e:
+        print(f"Error processing file {input_path}: {e}")
+        return None
+
+def write_parquet_dataset(df, output_dir):
+    """
+    Write merged LF data as a typed Parquet dataset partitioned by
+    source_year/source_month/source_lf. Partitions present in `df` are replaced,
+    other partitions are left untouched.
+
+    Text columns are stored as strings (times as 'HH:MM:SS', as in the CSV),
+    every other column as float64.
+    """
+    df = df.copy()
+    text_cols = [c for c in df.columns if c in NON_NUMERIC_COLUMNS]
+    value_cols = [c for c in df.columns if c not in NON_NUMERIC_COLUMNS and c not in PARTITION_COLUMNS]
+    df[text_cols] = df[text_cols].astype('string')
+    df[value_cols] = df[value_cols].astype('float64')
+    df.to_parquet(output_dir, partition_cols=PARTITION_COLUMNS, index=False,
+                  existing_data_behavior='delete_matching')
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def parse_to_part(input_path, part_path, fast=True):
+    """
+    Worker: parse one workbook and pickle the result to `part_path`.
+    Returns the row count, or None if the file could not be processed.
+    """
+    df = process_file_fast(input_path) if fast else process_file(input_path)
+    if df is None:
+        return None
+    df.to_pickle(part_path)
+    return len(df)
+
+def ingest_files(input_files, cache_dir, max_workers=None, force=False, fast=True):
+    """
+    Incrementally parse LF workbooks, reusing cached per-file parts.
+
+    The manifest in `cache_dir` records each file's mtime, size, SHA-256, reader and
+    parsed part. A file whose mtime and size are unchanged is skipped without reading it;
+    a file whose mtime changed but content hash did not is skipped after hashing. Parts
+    are named after the path and the content hash (the path gives source_year/month/lf),
+    and are re-parsed when the reader changes.
+    Only new or modified files are parsed, in a process pool, with process_file_fast
+    (or process_file when `fast` is False).
+
+    Returns:
+        list of str: Paths of the cached parts for the input files (in input order),
+        excluding files that produced no rows.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(cache_dir)
+    reader = 'stream' if fast else 'pandas'
+
+    to_parse = {}
+    unchanged = 0
+    for file_path in input_files:
+        if not os.path.exists(file_path):
+            print(f"Warning: File '{file_path}' not found. Skipping.")
+            continue
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = manifest.get(key)
+        part_ok = (entry is not None and entry.get('reader') == reader
+                   and (entry['part'] is None or os.path.exists(os.path.join(cache_dir, entry['part']))))
+
+        if part_ok and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            unchanged += 1
+            continue
+        sha = file_sha256(file_path)
+        if part_ok and entry['sha256'] == sha:
+            entry.update(mtime=stat.st_mtime, size=stat.st_size)
+            unchanged += 1
+            continue
+        part = hashlib.sha256(f"{os.path.normcase(key)}\n{sha}".encode()).hexdigest()
+        to_parse[key] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': sha, 'reader': reader,
+                         'part': f"{part}.pkl", 'rows': 0}
+
+    print(f"{unchanged} unchanged file(s), {len(to_parse)} to parse.")
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {key: pool.submit(parse_to_part, key, os.path.join(cache_dir, entry['part']), fast)
+                       for key, entry in to_parse.items()}
+            for key, future in futures.items():
+                rows = future.result()
+                if rows is None:
+                    # Not recorded, so the file is retried on the next run
+                    manifest.pop(key, None)
+                    continue
+                entry = to_parse[key]
+                entry['rows'] = rows
+                if rows == 0:
+                    os.remove(os.path.join(cache_dir, entry['part']))
+                    entry['part'] = None
+                manifest[key] = entry
+
+    save_manifest(cache_dir, manifest)
+
+    # Drop parts no longer referenced by any manifest entry (replaced workbooks)
+    referenced = {entry['part'] for entry in manifest.values()}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.pkl') and name not in referenced:
+            os.remove(os.path.join(cache_dir, name))
+
+    parts = []
+    for file_path in input_files:
+        entry = manifest.get(os.path.abspath(file_path))
+        if entry is not None and entry['part'] is not None:
+            parts.append(os.path.join(cache_dir, entry['part']))
+    return parts
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process multiple LF Excel files into a single CSV.")
     parser.add_argument("input_files", nargs="+", help="Paths to the input Excel files")
     parser.add_argument("-o", "--output", default="merged_lf_data.csv", help="Path to the output CSV file")
+    parser.add_argument("--parquet-dir", help="Also write a Parquet dataset partitioned by source_year/source_month/source_lf "
+                                              "(e.g. merged_lf_data.parquet)")
+    parser.add_argument("--cache-dir", help="Directory for the manifest and per-file parts (default: .lf_cache next to the output)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for parsing (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-parse every file")
+    parser.add_argument("--reader", choices=["stream", "pandas"], default="stream",
+                        help="'stream': process_file_fast (default), 'pandas': pd.read_excel based process_file")
     
     args = parser.parse_args()
+    cache_dir = args.cache_dir or os.path.join(os.path.dirname(os.path.abspath(args.output)), '.lf_cache')
     
-    all_dfs = []
-    for file_path in args.input_files:
-        df = process_file(file_path)
-        if df is not None and not df.empty:
-            all_dfs.append(df)
+    parts = ingest_files(args.input_files, cache_dir, max_workers=args.jobs, force=args.force,
+                         fast=args.reader == "stream")
     
-    if all_dfs:
-        merged_df = pd.concat(all_dfs, ignore_index=True)
+    if parts:
+        merged_df = pd.concat([pd.read_pickle(part) for part in parts], ignore_index=True)
         merged_df.to_csv(args.output, index=False)
-        print(f"\nSuccessfully merged {len(all_dfs)} files into: {args.output}")
+        print(f"\nSuccessfully merged {len(parts)} files into: {args.output}")
+        if args.parquet_dir:
+            write_parquet_dataset(merged_df, args.parquet_dir)
+            print(f"Wrote partitioned Parquet dataset: {args.parquet_dir}")
         print(f"Total rows: {len(merged_df)}")
     else:
-        print("\nNo data was processed.")
+        print("\nNo data was processed.")
\ No newline at end of file
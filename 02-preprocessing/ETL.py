@@ -1,39 +1,209 @@
+import argparse
+import json
+import os
+from datetime import datetime
 import pandas as pd
 
-# Đọc dữ liệu (Thay vì read_csv từ file, mình đọc từ chuỗi string ở trên để demo)
-# Trong máy bạn, hãy dùng: 
-df_var = pd.read_csv('01-data/REP_CCM_PRODUCT_VARS.csv')
-df_heat = pd.read_csv('01-data/REP_CCM_HEATS.csv')
-df_prod = pd.read_csv('01-data/REP_CCM_PRODUCTS.csv')
+from schemas import TSC_SCHEMA, read_typed_csv
 
-# --- BẮT ĐẦU XỬ LÝ JOIN BẢNG ---
+# VARIABLE_ID -> tên cột đầu ra: Tốc độ (13) và Nhiệt độ (45)
+DEFAULT_VARIABLES = {13: 'speed', 45: 'temperature'}
 
-# BƯỚC 1: Xử lý bảng VAR (Chuyển từ dòng sang cột)
-# Lọc lấy Tốc độ (13) và Nhiệt độ (45), chỉ lấy VALUE_CODE=1 (giá trị thực)
-df_speed = df_var[(df_var['VARIABLE_ID'] == 13) & (df_var['VALUE_CODE'] == 1)][['REPORT_COUNTER', 'PROD_COUNTER', 'AVG_VALUE']]
-df_speed.rename(columns={'AVG_VALUE': 'speed'}, inplace=True)
+# Chỉ đọc các cột cần thiết của bảng VAR (bảng lớn nhất)
+VAR_COLUMNS = ['REPORT_COUNTER', 'PROD_COUNTER', 'VARIABLE_ID', 'VALUE_CODE', 'AVG_VALUE']
+KEYS = ['REPORT_COUNTER', 'PROD_COUNTER']
 
-df_temp = df_var[(df_var['VARIABLE_ID'] == 45) & (df_var['VALUE_CODE'] == 1)][['REPORT_COUNTER', 'PROD_COUNTER', 'AVG_VALUE']]
-df_temp.rename(columns={'AVG_VALUE': 'temperature'}, inplace=True)
 
-# Gộp Speed và Temp lại thành 1 bảng var gọn gàng
-# Dùng outer join để giữ lại dữ liệu nếu có speed mà mất temp hoặc ngược lại
-df_vars_clean = pd.merge(df_speed, df_temp, on=['REPORT_COUNTER', 'PROD_COUNTER'], how='outer')
+def watermark_path(output_path):
+    return output_path + '.watermark.json'
 
-# BƯỚC 2: Join với bảng PRODUCT (Đây là bảng xương sống)
-# Dùng left join: Ưu tiên giữ lại tất cả các Phôi (Product), sau đó điền speed/temp vào
-# KHÓA CHÍNH: [REPORT_COUNTER, PROD_COUNTER]
-df_merged_1 = pd.merge(df_prod, df_vars_clean, on=['REPORT_COUNTER', 'PROD_COUNTER'], how='left')
 
-# BƯỚC 3: Join với bảng HEAT (Để lấy thông tin Mẻ)
-# Dùng left join: Mỗi phôi sẽ được gắn thông tin của Mẻ tương ứng
-# KHÓA CHÍNH: REPORT_COUNTER
-df_final = pd.merge(df_merged_1, df_heat, on='REPORT_COUNTER', how='left')
+def load_watermark(output_path):
+    """Đọc watermark (REPORT_COUNTER lớn nhất đã xử lý) của file đầu ra, None nếu chưa có."""
+    path = watermark_path(output_path)
+    if not os.path.exists(output_path) or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
 
-# Sắp xếp lại cho đẹp: Theo Mẻ -> Theo Phôi
-df_final.sort_values(by=['REPORT_COUNTER', 'PROD_COUNTER'], inplace=True)
 
-# Xuất ra file CSV
-df_final.to_csv('01-data/TSC.csv', index=False)
+def save_watermark(output_path, report_counter, variables):
+    path = watermark_path(output_path)
+    state = {
+        'report_counter': int(report_counter),
+        'variables': {str(k): v for k, v in variables.items()},
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + '.tmp', path)
 
-print("Đã xử lý xong!")
\ No newline at end of file
+
+def read_new_rows(path, min_report_counter=None, chunksize=1_000_000):
+    """
+    Đọc bảng HEAT/PRODUCT, chỉ giữ REPORT_COUNTER > min_report_counter (đọc theo chunk).
+
+    Kiểu cột theo TSC_SCHEMA (chuỗi -> category, số nguyên thu nhỏ), nhưng giữ float64
+    và ngày dạng chuỗi để TSC.csv ghi ra không đổi.
+    """
+    row_filter = None
+    if min_report_counter is not None:
+        row_filter = lambda chunk: chunk['REPORT_COUNTER'] > min_report_counter
+    return read_typed_csv(path, TSC_SCHEMA, parse_dates=False, float_dtype='float64',
+                          chunksize=chunksize if row_filter else None, row_filter=row_filter)
+
+
+def pivot_product_vars(var_path, variables=DEFAULT_VARIABLES, chunksize=1_000_000, min_report_counter=None):
+    """
+    Đọc bảng REP_CCM_PRODUCT_VARS theo từng chunk và chuyển từ dòng sang cột.
+
+    Mỗi chunk chỉ đọc VAR_COLUMNS và chỉ giữ các dòng có VARIABLE_ID cần lấy với
+    VALUE_CODE=1 (giá trị thực), nên bộ nhớ tối đa phụ thuộc vào chunksize chứ không
+    phụ thuộc vào kích thước file. Tất cả biến được pivot trong một lần.
+
+    Args:
+        var_path (str): Đường dẫn REP_CCM_PRODUCT_VARS.csv.
+        variables (dict): VARIABLE_ID -> tên cột, ví dụ {13: 'speed', 45: 'temperature'}.
+        chunksize (int): Số dòng mỗi chunk.
+        min_report_counter (int, optional): Chỉ lấy REPORT_COUNTER > giá trị này (chạy incremental).
+
+    Returns:
+        pd.DataFrame: Một dòng cho mỗi (REPORT_COUNTER, PROD_COUNTER), một cột cho mỗi biến.
+    """
+    variable_ids = list(variables)
+    pieces = []
+    # Kiểu nullable để ô trống không làm lỗi read_csv; thu nhỏ về int thường sau khi lọc
+    dtype = {'REPORT_COUNTER': 'Int64', 'PROD_COUNTER': 'Int32', 'VARIABLE_ID': 'Int16', 'VALUE_CODE': 'Int8',
+             'AVG_VALUE': 'float64'}
+    key_dtype = {'REPORT_COUNTER': 'int64', 'PROD_COUNTER': 'int32', 'VARIABLE_ID': 'int16'}
+    reader = pd.read_csv(var_path, usecols=VAR_COLUMNS, dtype=dtype, chunksize=chunksize)
+    for chunk in reader:
+        mask = (chunk['VARIABLE_ID'].isin(variable_ids) & chunk['VALUE_CODE'].eq(1).fillna(False)
+                & chunk[KEYS].notna().all(axis=1))
+        if min_report_counter is not None:
+            mask &= chunk['REPORT_COUNTER'].gt(min_report_counter).fillna(False)
+        pieces.append(chunk.loc[mask, KEYS + ['VARIABLE_ID', 'AVG_VALUE']].astype(key_dtype))
+
+    df_long = pd.concat(pieces, ignore_index=True)
+
+    # Mỗi (REPORT_COUNTER, PROD_COUNTER, VARIABLE_ID) lấy giá trị đầu tiên
+    df_wide = (
+        df_long.groupby(KEYS + ['VARIABLE_ID'], sort=False)['AVG_VALUE'].first()
+        .unstack('VARIABLE_ID')
+        .reindex(columns=variable_ids)
+        .rename(columns=variables)
+    )
+    df_wide.columns.name = None
+    return df_wide.reset_index()
+
+
+def build_tsc(var_path, heat_path, prod_path, variables=DEFAULT_VARIABLES, chunksize=1_000_000,
+              min_report_counter=None):
+    """
+    Join bảng VAR (đã pivot) với PRODUCT và HEAT.
+    Với min_report_counter, chỉ xử lý các dòng có REPORT_COUNTER lớn hơn (chạy incremental).
+    """
+    # BƯỚC 1: Xử lý bảng VAR (Chuyển từ dòng sang cột)
+    df_vars_clean = pivot_product_vars(var_path, variables=variables, chunksize=chunksize,
+                                       min_report_counter=min_report_counter)
+
+    df_heat = read_new_rows(heat_path, min_report_counter, chunksize)
+    df_prod = read_new_rows(prod_path, min_report_counter, chunksize)
+
+    # BƯỚC 2: Join với bảng PRODUCT (Đây là bảng xương sống)
+    # Dùng left join: Ưu tiên giữ lại tất cả các Phôi (Product), sau đó điền speed/temp vào
+    # KHÓA CHÍNH: [REPORT_COUNTER, PROD_COUNTER]
+    df_merged_1 = pd.merge(df_prod, df_vars_clean, on=KEYS, how='left')
+
+    # BƯỚC 3: Join với bảng HEAT (Để lấy thông tin Mẻ)
+    # Dùng left join: Mỗi phôi sẽ được gắn thông tin của Mẻ tương ứng
+    # KHÓA CHÍNH: REPORT_COUNTER
+    df_final = pd.merge(df_merged_1, df_heat, on='REPORT_COUNTER', how='left')
+
+    # Sắp xếp lại cho đẹp: Theo Mẻ -> Theo Phôi
+    df_final.sort_values(by=KEYS, inplace=True)
+    return df_final
+
+
+def parse_variables(specs):
+    """['13:speed', '45:temperature'] -> {13: 'speed', 45: 'temperature'}"""
+    variables = {}
+    for spec in specs:
+        variable_id, _, name = spec.partition(':')
+        variables[int(variable_id)] = name or f'var_{variable_id}'
+    return variables
+
+
+def upsert_output(df_new, output_path, min_report_counter, chunksize=1_000_000):
+    """
+    Thay các dòng REPORT_COUNTER > min_report_counter của file đầu ra bằng df_new (sắp cột theo header hiện có).
+
+    Các dòng cũ được đọc dạng chuỗi theo chunk và ghi lại nguyên văn vào file tạm, sau đó
+    ghi nối df_new và thay file bằng os.replace.
+    """
+    header = pd.read_csv(output_path, nrows=0).columns
+    extra = [c for c in df_new.columns if c not in header]
+    if extra:
+        print(f"Warning: bỏ qua các cột không có trong {output_path}: {extra}")
+    tmp_path = output_path + '.tmp'
+    pd.DataFrame(columns=header).to_csv(tmp_path, index=False)
+    replaced = 0
+    reader = pd.read_csv(output_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    for chunk in reader:
+        keep = pd.to_numeric(chunk['REPORT_COUNTER']) <= min_report_counter
+        replaced += int((~keep).sum())
+        chunk[keep].to_csv(tmp_path, mode='a', header=False, index=False)
+    df_new.reindex(columns=header).to_csv(tmp_path, mode='a', header=False, index=False)
+    os.replace(tmp_path, output_path)
+    return replaced
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build TSC.csv from the REP_CCM_* exports.")
+    parser.add_argument("--data-dir", default="01-data", help="Folder containing REP_CCM_*.csv")
+    parser.add_argument("-o", "--output", default="01-data/TSC.csv", help="Output CSV")
+    parser.add_argument("--variables", nargs="+", default=[f"{k}:{v}" for k, v in DEFAULT_VARIABLES.items()],
+                        help="VARIABLE_ID:column pairs to pivot (default: 13:speed 45:temperature)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per chunk when reading the exports")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="Ignore the REPORT_COUNTER watermark and rebuild the output from scratch")
+    parser.add_argument("--lookback", type=int, default=0,
+                        help="Also recompute heats with REPORT_COUNTER >= watermark - LOOKBACK (default 0: "
+                             "only the last processed heat, which may still have been casting)")
+    args = parser.parse_args()
+
+    variables = parse_variables(args.variables)
+    state = None if args.full_rebuild else load_watermark(args.output)
+    if state is not None and state['variables'] != {str(k): v for k, v in variables.items()}:
+        print("Danh sách biến khác với lần chạy trước -> build lại toàn bộ.")
+        state = None
+    # Mẻ tại watermark có thể đang đúc dở: tính lại từ watermark - lookback và thay các dòng cũ của chúng
+    min_report_counter = state['report_counter'] - args.lookback - 1 if state else None
+
+    if min_report_counter is None:
+        print("Build toàn bộ...")
+    else:
+        print(f"Chạy incremental: xử lý lại REPORT_COUNTER > {min_report_counter}")
+
+    df_final = build_tsc(
+        f"{args.data_dir}/REP_CCM_PRODUCT_VARS.csv",
+        f"{args.data_dir}/REP_CCM_HEATS.csv",
+        f"{args.data_dir}/REP_CCM_PRODUCTS.csv",
+        variables=variables,
+        chunksize=args.chunksize,
+        min_report_counter=min_report_counter,
+    )
+
+    if df_final.empty:
+        print("Không có dữ liệu mới.")
+    else:
+        # Xuất ra file CSV
+        if min_report_counter is None:
+            df_final.to_csv(args.output, index=False)
+        else:
+            replaced = upsert_output(df_final, args.output, min_report_counter, args.chunksize)
+            print(f"Thay {replaced} dòng cũ của các mẻ tính lại")
+        save_watermark(args.output, df_final['REPORT_COUNTER'].max(), variables)
+        print(f"Đã ghi {len(df_final)} dòng vào {args.output} (watermark REPORT_COUNTER={df_final['REPORT_COUNTER'].max()})")
+
+    print("Đã xử lý xong!")
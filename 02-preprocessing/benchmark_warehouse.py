@@ -0,0 +1,119 @@
+"""
+Benchmark the SQLite CCM warehouse against the pandas merge chain of ETL.py.
+
+Without --data-dir, synthetic REP_CCM_* exports are generated from the rows in
+01-data/sample (heats tiled with new REPORT_COUNTERs, grades and dates spread
+over three years). Both sides answer the same question: speed and temperature
+per product for one grade in a date range.
+
+Example:
+    python 02-preprocessing/benchmark_warehouse.py --heats 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ETL import build_tsc
+from ccm_warehouse import CCMWarehouse, build_warehouse
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01-data', 'sample')
+
+
+def make_exports(out_dir, n_heats, products_per_heat=6, extra_variables=8, seed=0):
+    """Write synthetic REP_CCM_{HEATS,PRODUCTS,PRODUCT_VARS}.csv based on the sample rows."""
+    rng = np.random.default_rng(seed)
+    heats_s = pd.read_csv(os.path.join(SAMPLE_DIR, 'REP_CCM_HEATS_sample.csv'))
+    prods_s = pd.read_csv(os.path.join(SAMPLE_DIR, 'REP_CCM_PRODUCTS_sample.csv'))
+    vars_s = pd.read_csv(os.path.join(SAMPLE_DIR, 'REP_CCM_PRODUCT_VARS_sample.csv'))
+
+    heats = heats_s.iloc[rng.integers(0, len(heats_s), n_heats)].reset_index(drop=True)
+    heats['REPORT_COUNTER'] = np.arange(1, n_heats + 1)
+    heats['STEEL_GRADE_NAME'] = rng.choice(['SAE1006', 'SAE1008', 'Q235B'], n_heats, p=[0.6, 0.25, 0.15])
+    start = pd.Timestamp('2023-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 3 * 365, n_heats)), unit='D')
+    heats['START_DATE'] = start.strftime('%Y-%m-%d %H:%M:%S.000')
+
+    n_prod = n_heats * products_per_heat
+    prods = prods_s.iloc[rng.integers(0, len(prods_s), n_prod)].reset_index(drop=True)
+    prods['REPORT_COUNTER'] = np.repeat(heats['REPORT_COUNTER'].to_numpy(), products_per_heat)
+    prods['PROD_COUNTER'] = np.tile(np.arange(1, products_per_heat + 1), n_heats)
+
+    variable_ids = np.array([13, 45] + list(range(100, 100 + extra_variables)))
+    value_codes = np.array([1, 2, 3])
+    n_var = n_prod * len(variable_ids) * len(value_codes)
+    var_rows = vars_s.iloc[rng.integers(0, len(vars_s), n_var)].reset_index(drop=True)
+    var_rows['REPORT_COUNTER'] = np.repeat(prods['REPORT_COUNTER'].to_numpy(), len(variable_ids) * len(value_codes))
+    var_rows['PROD_COUNTER'] = np.repeat(prods['PROD_COUNTER'].to_numpy(), len(variable_ids) * len(value_codes))
+    var_rows['VARIABLE_ID'] = np.tile(np.repeat(variable_ids, len(value_codes)), n_prod)
+    var_rows['VALUE_CODE'] = np.tile(value_codes, n_prod * len(variable_ids))
+    var_rows['AVG_VALUE'] = rng.normal(1000, 300, n_var)
+
+    heats.to_csv(os.path.join(out_dir, 'REP_CCM_HEATS.csv'), index=False)
+    prods.to_csv(os.path.join(out_dir, 'REP_CCM_PRODUCTS.csv'), index=False)
+    var_rows.to_csv(os.path.join(out_dir, 'REP_CCM_PRODUCT_VARS.csv'), index=False)
+    return len(heats), len(prods), len(var_rows)
+
+
+def pandas_chain(data_dir, grade, start, end):
+    """Current approach: full ETL merge chain, then filter."""
+    df = build_tsc(os.path.join(data_dir, 'REP_CCM_PRODUCT_VARS.csv'),
+                   os.path.join(data_dir, 'REP_CCM_HEATS.csv'),
+                   os.path.join(data_dir, 'REP_CCM_PRODUCTS.csv'))
+    mask = (df['STEEL_GRADE_NAME'] == grade) & (df['START_DATE'] >= start) & (df['START_DATE'] < end)
+    return df.loc[mask, ['REPORT_COUNTER', 'PROD_COUNTER', 'speed', 'temperature']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark warehouse queries vs the pandas merge chain.")
+    parser.add_argument("--data-dir", help="Folder with REP_CCM_*.csv (default: generate synthetic exports)")
+    parser.add_argument("--heats", type=int, default=5000, help="Synthetic heats to generate")
+    parser.add_argument("--grade", default="SAE1006")
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--end", default="2025-04-01")
+    parser.add_argument("--repeat", type=int, default=3, help="Warehouse query repetitions")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    data_dir = args.data_dir
+    if data_dir is None:
+        data_dir = tmp_dir.name
+        n_h, n_p, n_v = make_exports(data_dir, args.heats)
+        print(f"Synthetic exports: {n_h} heats, {n_p} products, {n_v} var rows")
+    db_path = os.path.join(tmp_dir.name, 'ccm_warehouse.sqlite')
+
+    start = time.perf_counter()
+    expected = pandas_chain(data_dir, args.grade, args.start, args.end)
+    pandas_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_warehouse(data_dir, db_path)
+    build_s = time.perf_counter() - start
+
+    wh = CCMWarehouse(db_path)
+    query_times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = wh.speed_temperature(grade=args.grade, start=args.start, end=args.end)
+        query_times.append(time.perf_counter() - start)
+    wh.close()
+
+    merged = expected.merge(result, on=['REPORT_COUNTER', 'PROD_COUNTER'], suffixes=('_pd', '_wh'))
+    same = (len(expected) == len(result) == len(merged)
+            and np.allclose(merged['speed_pd'], merged['speed_wh'], equal_nan=True)
+            and np.allclose(merged['temperature_pd'], merged['temperature_wh'], equal_nan=True))
+
+    query_s = min(query_times)
+    print(f"\n{'Step':<36} {'Seconds':>10}")
+    print("-" * 48)
+    print(f"{'pandas merge chain + filter':<36} {pandas_s:>10.3f}")
+    print(f"{'warehouse build (one-off)':<36} {build_s:>10.3f}")
+    print(f"{'warehouse query (best of ' + str(args.repeat) + ')':<36} {query_s:>10.3f}")
+    print(f"\nRows: {len(result)}  |  results identical: {same}  |  query speedup: {pandas_s / query_s:.1f}x")
+
+    tmp_dir.cleanup()
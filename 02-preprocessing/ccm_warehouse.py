@@ -0,0 +1,190 @@
+"""
+Embedded local warehouse for the CCM report tables.
+
+Loads REP_CCM_HEATS, REP_CCM_PRODUCTS and REP_CCM_PRODUCT_VARS into a SQLite
+file (no server, works offline) with indexes on REPORT_COUNTER / PROD_COUNTER /
+VARIABLE_ID, so typical questions are answered from the indexes instead of a
+full-table pandas merge chain.
+
+Usage:
+    python ccm_warehouse.py build --data-dir 01-data --db 01-data/ccm_warehouse.sqlite
+
+    from ccm_warehouse import CCMWarehouse
+    wh = CCMWarehouse('01-data/ccm_warehouse.sqlite')
+    df = wh.speed_temperature(grade='SAE1006', start='2025-01-01', end='2025-04-01')
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+DEFAULT_DB = '01-data/ccm_warehouse.sqlite'
+
+# table name -> export file
+TABLES = {
+    'heats': 'REP_CCM_HEATS.csv',
+    'products': 'REP_CCM_PRODUCTS.csv',
+    'product_vars': 'REP_CCM_PRODUCT_VARS.csv',
+}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_heats_rc ON heats(REPORT_COUNTER)",
+    "CREATE INDEX IF NOT EXISTS idx_heats_grade_start ON heats(STEEL_GRADE_NAME, START_DATE)",
+    "CREATE INDEX IF NOT EXISTS idx_heats_start ON heats(START_DATE)",
+    "CREATE INDEX IF NOT EXISTS idx_products_rc_pc ON products(REPORT_COUNTER, PROD_COUNTER)",
+    # Covering index: the speed/temperature lookup never touches the table rows
+    "CREATE INDEX IF NOT EXISTS idx_vars_rc_pc_var ON product_vars"
+    "(REPORT_COUNTER, PROD_COUNTER, VARIABLE_ID, VALUE_CODE, AVG_VALUE)",
+    "CREATE INDEX IF NOT EXISTS idx_vars_var ON product_vars(VARIABLE_ID)",
+]
+
+# VARIABLE_ID -> output column
+DEFAULT_VARIABLES = {13: 'speed', 45: 'temperature'}
+
+
+def build_warehouse(data_dir='01-data', db_path=DEFAULT_DB, chunksize=500_000):
+    """
+    (Re)build the SQLite warehouse from the CSV exports, loading in chunks.
+
+    Returns:
+        dict: Row count per table.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    # Bulk load: no journal, no fsync; the file is rebuilt from the exports anyway
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    counts = {}
+    try:
+        for table, file_name in TABLES.items():
+            path = os.path.join(data_dir, file_name)
+            start = time.perf_counter()
+            counts[table] = 0
+            for chunk in pd.read_csv(path, chunksize=chunksize):
+                chunk.to_sql(table, conn, if_exists='append', index=False)
+                counts[table] += len(chunk)
+            print(f"  -> {table}: {counts[table]} rows in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"  -> indexes built in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+    return counts
+
+
+class CCMWarehouse:
+    """Query API over the SQLite warehouse built by build_warehouse."""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Warehouse '{db_path}' not found. Run: python ccm_warehouse.py build")
+        self.conn = sqlite3.connect(db_path)
+
+    def query(self, sql, params=()):
+        """Run any SQL and return a DataFrame."""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def speed_temperature(self, grade=None, start=None, end=None, variables=DEFAULT_VARIABLES, value_code=1):
+        """
+        Speed and temperature (or any `variables`) per product, filtered by grade
+        and heat START_DATE range.
+
+        Args:
+            grade (str, optional): Exact STEEL_GRADE_NAME, or a LIKE pattern when it
+                contains '%' (e.g. 'SAE1006%'). Exact names use the grade index.
+            start, end (str, optional): START_DATE range [start, end), 'YYYY-MM-DD[ HH:MM:SS]'.
+            variables (dict): VARIABLE_ID -> output column name.
+            value_code (int): VALUE_CODE to keep (1 = actual value).
+
+        Returns:
+            pd.DataFrame: One row per product with heat info and one column per variable.
+        """
+        pivots = ",\n".join(
+            f"MAX(CASE WHEN v.VARIABLE_ID = {int(var_id)} THEN v.AVG_VALUE END) AS \"{name}\""
+            for var_id, name in variables.items()
+        )
+        var_ids = ', '.join(str(int(v)) for v in variables)
+
+        where, params = [], [value_code]
+        if grade is not None:
+            where.append("h.STEEL_GRADE_NAME LIKE ?" if '%' in grade else "h.STEEL_GRADE_NAME = ?")
+            params.append(grade)
+        if start is not None:
+            where.append("h.START_DATE >= ?")
+            params.append(str(start))
+        if end is not None:
+            where.append("h.START_DATE < ?")
+            params.append(str(end))
+
+        sql = f"""
+            SELECT p.REPORT_COUNTER, p.PROD_COUNTER, h.HEAT_ID, h.STEEL_GRADE_NAME,
+                   h.START_DATE, p.CUT_DATE,
+                   {pivots}
+            FROM heats h
+            JOIN products p ON p.REPORT_COUNTER = h.REPORT_COUNTER
+            LEFT JOIN product_vars v
+                   ON v.REPORT_COUNTER = p.REPORT_COUNTER
+                  AND v.PROD_COUNTER = p.PROD_COUNTER
+                  AND v.VARIABLE_ID IN ({var_ids})
+                  AND v.VALUE_CODE = ?
+            {"WHERE " + " AND ".join(where) if where else ""}
+            GROUP BY p.REPORT_COUNTER, p.PROD_COUNTER
+            ORDER BY p.REPORT_COUNTER, p.PROD_COUNTER
+        """
+        return self.query(sql, params)
+
+    def variable_history(self, variable_id, report_counters, value_code=1):
+        """All values of one VARIABLE_ID for the given heats (REPORT_COUNTER list)."""
+        placeholders = ', '.join('?' for _ in report_counters)
+        sql = f"""
+            SELECT REPORT_COUNTER, PROD_COUNTER, AVG_VALUE
+            FROM product_vars
+            WHERE REPORT_COUNTER IN ({placeholders}) AND VARIABLE_ID = ? AND VALUE_CODE = ?
+            ORDER BY REPORT_COUNTER, PROD_COUNTER
+        """
+        return self.query(sql, [int(rc) for rc in report_counters] + [int(variable_id), value_code])
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the local CCM warehouse.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Load REP_CCM_*.csv into SQLite and build indexes")
+    p_build.add_argument("--data-dir", default="01-data")
+    p_build.add_argument("--db", default=DEFAULT_DB)
+    p_build.add_argument("--chunksize", type=int, default=500_000)
+
+    p_query = sub.add_parser("query", help="Speed/temperature per product for a grade and date range")
+    p_query.add_argument("--db", default=DEFAULT_DB)
+    p_query.add_argument("--grade", help="STEEL_GRADE_NAME, or LIKE pattern with %%")
+    p_query.add_argument("--start", help="START_DATE >= (YYYY-MM-DD)")
+    p_query.add_argument("--end", help="START_DATE < (YYYY-MM-DD)")
+    p_query.add_argument("-o", "--output", help="Write the result to CSV")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"Building {args.db} from {args.data_dir}...")
+        build_warehouse(args.data_dir, args.db, chunksize=args.chunksize)
+    else:
+        wh = CCMWarehouse(args.db)
+        start = time.perf_counter()
+        df = wh.speed_temperature(grade=args.grade, start=args.start, end=args.end)
+        print(f"{len(df)} rows in {time.perf_counter() - start:.3f}s")
+        if args.output:
+            df.to_csv(args.output, index=False)
+        else:
+            print(df.head(20).to_string(index=False))
+        wh.close()
@@ -0,0 +1,102 @@
+"""
+Downsampling helpers for plotting long series.
+
+All functions return sorted row indices into the original series, so the same
+selection can be applied to every column of a DataFrame (`df.iloc[idx]`).
+"""
+
+import numpy as np
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max decimation: split the series into n_out // 2 equal buckets and keep the
+    index of the minimum and maximum of each bucket, so peaks survive.
+
+    Args:
+        y (array-like): Values in plotting order; NaN is ignored.
+        n_out (int): Target number of points (about 2 per bucket).
+
+    Returns:
+        np.ndarray: Sorted unique int64 indices, at most n_out (+ first/last point).
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n_out <= 0 or n <= n_out:
+        return np.arange(n, dtype='int64')
+
+    n_buckets = max(n_out // 2, 1)
+    size = -(-n // n_buckets)  # ceil
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+
+    nan = np.isnan(blocks)
+    offsets = np.arange(n_buckets) * size
+    i_min = np.where(nan, np.inf, blocks).argmin(axis=1) + offsets
+    i_max = np.where(nan, -np.inf, blocks).argmax(axis=1) + offsets
+
+    idx = np.concatenate([[0, n - 1], i_min, i_max])
+    return np.unique(idx[idx < n]).astype('int64')
+
+
+def minmax_indices_multi(columns, n_out):
+    """Union of minmax_indices over several series, sharing the n_out budget."""
+    columns = list(columns)
+    per_column = max(n_out // max(len(columns), 1), 2)
+    picks = [minmax_indices(col, per_column) for col in columns]
+    return np.unique(np.concatenate(picks)) if picks else np.array([], dtype='int64')
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013).
+
+    Keeps the first and last point and, for each of the n_out - 2 buckets in
+    between, the point forming the largest triangle with the previously kept
+    point and the average of the next bucket. Preserves the visual shape of the
+    series much better than taking every k-th row.
+
+    Args:
+        x (array-like): Monotonic x values (numbers or datetime64).
+        y (array-like): Values; rows where x or y is NaN/NaT are skipped.
+        n_out (int): Number of points to keep (>= 3).
+
+    Returns:
+        np.ndarray: Sorted int64 indices into the original arrays.
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        valid_x = ~np.isnat(x)
+        x = x.astype('datetime64[ns]').astype('int64').astype('float64')
+    else:
+        x = x.astype('float64')
+        valid_x = ~np.isnan(x)
+    y = np.asarray(y, dtype='float64')
+
+    valid = np.flatnonzero(valid_x & ~np.isnan(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid.astype('int64')
+    xv, yv = x[valid], y[valid]
+
+    # Bucket edges for the n - 2 points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    picked = np.empty(n_out, dtype='int64')
+    picked[0], picked[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = xv[nlo:nhi].mean(), yv[nlo:nhi].mean()
+        else:
+            avg_x, avg_y = xv[-1], yv[-1]
+
+        area = np.abs((xv[a] - avg_x) * (yv[lo:hi] - yv[a]) - (xv[a] - xv[lo:hi]) * (avg_y - yv[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+
+    return valid[picked].astype('int64')
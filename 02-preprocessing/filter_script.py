@@ -1,46 +1,175 @@
-import pandas as pd
+"""
+Filter TSC data by steel grade and START_DATE range without loading the whole file.
+
+The input is scanned in chunks (CSV) or record batches (Parquet) and only the
+needed columns are read; matching rows are appended to the output as they are
+found, so memory depends on the chunk size rather than on the file size. With
+Parquet the grade and date predicates are pushed into pyarrow.dataset, so
+partitions and row groups whose START_DATE statistics are out of range are
+skipped and only matching rows reach pandas.
+
+Usage:
+    python filter_script.py                                   # SAE1006AL, year 2025 (old behaviour)
+    python filter_script.py --grade SAE1008 --start 2024-07-01 --end 2025-01-01 \
+        --columns REPORT_COUNTER START_DATE speed temperature -o ../01-data/TSC_SAE1008_2024H2.csv
+
+    from filter_script import filter_tsc
+    df = filter_tsc('01-data/TSC_clean.csv', grade='SAE1006AL', year=2025)
+"""
+
+import argparse
 import os
 
-# Define file paths
-input_file = r'e:\OneDrive - hoaphat.com.vn\Code\alu-temp-cast-ml\01-data\TSC_clean.csv'
-output_file = r'e:\OneDrive - hoaphat.com.vn\Code\alu-temp-cast-ml\01-data\TSC_SAE1006AL_2025.csv'
-
-print(f"Reading {input_file}...")
-try:
-    df = pd.read_csv(input_file)
-    print(f"Total rows: {len(df)}")
-
-    # 1. Filter by Steel Grade (Mac Thep) containing 'SAE1006AL'
-    # Checking both STEEL_GRADE_NAME and FINAL_STEEL_GRADE_NAME just in case, but usually STEEL_GRADE_NAME is sufficient.
-    # User mentioned 'Mac Thep'.
-    
-    # Ensure string type for filtering logic
-    df['STEEL_GRADE_NAME'] = df['STEEL_GRADE_NAME'].astype(str)
-    
-    # Filter
-    grade_mask = df['STEEL_GRADE_NAME'].str.contains('SAE1006AL', case=False, na=False)
-    df_filtered_grade = df[grade_mask]
-    
-    print(f"Rows after grade filter ('SAE1006AL'): {len(df_filtered_grade)}")
-
-    # 2. Filter by Year 2025
-    # Using START_DATE as the reference date
-    df_filtered_grade['START_DATE'] = pd.to_datetime(df_filtered_grade['START_DATE'], errors='coerce')
-    
-    # Drop rows where date parsing failed (if any) - optional but good for data integrity
-    df_filtered_grade = df_filtered_grade.dropna(subset=['START_DATE'])
-    
-    year_mask = df_filtered_grade['START_DATE'].dt.year == 2025
-    df_final = df_filtered_grade[year_mask]
-    
-    print(f"Rows after year 2025 filter: {len(df_final)}")
-
-    # 3. Save to file
-    if len(df_final) > 0:
-        df_final.to_csv(output_file, index=False)
-        print(f"Successfully saved {len(df_final)} rows to {output_file}")
+import pandas as pd
+
+DEFAULT_INPUT = '01-data/TSC_clean.csv'
+GRADE_COLUMN = 'STEEL_GRADE_NAME'
+DATE_COLUMN = 'START_DATE'
+
+
+def _date_bounds(start, end, year):
+    """[lower, upper) START_DATE bounds as Timestamps (None = open) from start/end/year."""
+    lower = pd.Timestamp(start) if start is not None else None
+    upper = pd.Timestamp(end) if end is not None else None
+    if year is not None:
+        year_start, year_end = pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year + 1, month=1, day=1)
+        lower = year_start if lower is None else max(lower, year_start)
+        upper = year_end if upper is None else min(upper, year_end)
+    return lower, upper
+
+
+def _parquet_filter(schema, grade, start, end, year):
+    """
+    pyarrow.dataset expression for the grade and date filters (None if there is none).
+
+    The date predicate is only pushed down for a naive timestamp START_DATE; text dates
+    are left to _filter_chunk. Rows passing the expression are checked again there.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    expression = None
+    if grade is not None and GRADE_COLUMN in schema.names:
+        expression = pc.match_substring(ds.field(GRADE_COLUMN).cast(pa.string()), grade, ignore_case=True)
+    date_type = schema.field(DATE_COLUMN).type if DATE_COLUMN in schema.names else None
+    if date_type is not None and pa.types.is_timestamp(date_type) and date_type.tz is None:
+        for bound, compare in zip(_date_bounds(start, end, year), (pc.greater_equal, pc.less)):
+            if bound is not None:
+                term = compare(ds.field(DATE_COLUMN), pa.scalar(bound.to_pydatetime(), type=date_type))
+                expression = term if expression is None else expression & term
+    return expression
+
+
+def _iter_chunks(input_path, columns, chunksize, grade=None, start=None, end=None, year=None):
+    """Yield DataFrames of at most `chunksize` rows with only `columns` (None = all)."""
+    if input_path.endswith('.parquet') or os.path.isdir(input_path):
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(input_path, format='parquet', partitioning='hive')
+        row_filter = _parquet_filter(dataset.schema, grade, start, end, year)
+        for batch in dataset.to_batches(columns=columns, filter=row_filter, batch_size=chunksize):
+            yield batch.to_pandas()
     else:
-        print("No data found matching criteria. Output file not created.")
+        yield from pd.read_csv(input_path, usecols=columns, chunksize=chunksize)
+
+
+def _filter_chunk(chunk, grade, start, end, year):
+    """Apply the grade and date filters to one chunk."""
+    if grade is not None:
+        grade_mask = chunk[GRADE_COLUMN].astype(str).str.contains(grade, case=False, na=False, regex=False)
+        chunk = chunk[grade_mask]
+
+    if start is None and end is None and year is None:
+        return chunk
+
+    # Parse dates only for rows that passed the grade filter; unparsable dates are dropped
+    chunk = chunk.assign(**{DATE_COLUMN: pd.to_datetime(chunk[DATE_COLUMN], errors='coerce')})
+    date_mask = chunk[DATE_COLUMN].notna()
+    if year is not None:
+        date_mask &= chunk[DATE_COLUMN].dt.year == year
+    if start is not None:
+        date_mask &= chunk[DATE_COLUMN] >= pd.Timestamp(start)
+    if end is not None:
+        date_mask &= chunk[DATE_COLUMN] < pd.Timestamp(end)
+    return chunk[date_mask]
+
+
+def filter_tsc(input_path, output_path=None, grade=None, start=None, end=None, year=None,
+               columns=None, chunksize=200_000):
+    """
+    Filter TSC data by grade and START_DATE, scanning the input chunk by chunk.
+
+    Args:
+        input_path (str): TSC CSV file, Parquet file or Parquet dataset directory.
+        output_path (str, optional): CSV to write matching rows to (streamed). When
+            omitted the matching rows are returned as a DataFrame.
+        grade (str, optional): Case-insensitive substring of STEEL_GRADE_NAME (e.g. 'SAE1006AL').
+        start, end (str, optional): START_DATE range [start, end), e.g. '2025-01-01'.
+        year (int, optional): Keep only START_DATE in this year.
+        columns (list of str, optional): Output columns (default: all). Filter
+            columns are read even if not listed.
+        chunksize (int): Rows per chunk / record batch.
+
+    Returns:
+        pd.DataFrame if output_path is None, otherwise the number of rows written.
+    """
+    read_columns = None
+    if columns is not None:
+        filter_columns = []
+        if grade is not None:
+            filter_columns.append(GRADE_COLUMN)
+        if start is not None or end is not None or year is not None:
+            filter_columns.append(DATE_COLUMN)
+        read_columns = list(dict.fromkeys(list(columns) + filter_columns))
+
+    rows_read = rows_kept = 0
+    pieces = []
+    for chunk in _iter_chunks(input_path, read_columns, chunksize, grade, start, end, year):
+        rows_read += len(chunk)
+        chunk = _filter_chunk(chunk, grade, start, end, year)
+        if columns is not None:
+            chunk = chunk[list(columns)]
+        if chunk.empty:
+            continue
+
+        if output_path is None:
+            pieces.append(chunk)
+        else:
+            # First matching chunk creates the file with a header, later chunks append
+            chunk.to_csv(output_path, mode='w' if rows_kept == 0 else 'a', header=rows_kept == 0, index=False)
+        rows_kept += len(chunk)
+
+    print(f"Scanned {rows_read} rows, kept {rows_kept}")
+    if output_path is None:
+        return pd.concat(pieces, ignore_index=True) if pieces else pd.DataFrame(columns=columns)
+    return rows_kept
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter TSC data by steel grade and START_DATE range.")
+    parser.add_argument("-i", "--input", default=DEFAULT_INPUT, help="TSC CSV or Parquet (file or dataset dir)")
+    parser.add_argument("-o", "--output", help="Output CSV (default: <input dir>/TSC_<grade>_<year>.csv)")
+    parser.add_argument("--grade", default="SAE1006AL", help="Case-insensitive substring of STEEL_GRADE_NAME")
+    parser.add_argument("--year", type=int, default=2025, help="START_DATE year (ignored when --start/--end is given)")
+    parser.add_argument("--start", help="START_DATE >= (YYYY-MM-DD)")
+    parser.add_argument("--end", help="START_DATE < (YYYY-MM-DD)")
+    parser.add_argument("--columns", nargs="+", help="Columns to keep (default: all)")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="Rows per chunk")
+    args = parser.parse_args()
+
+    year = None if (args.start or args.end) else args.year
+    output_file = args.output
+    if output_file is None:
+        suffix = year if year is not None else f"{args.start or ''}_{args.end or ''}"
+        output_file = os.path.join(os.path.dirname(args.input), f"TSC_{args.grade}_{suffix}.csv")
 
-except Exception as e:
-    print(f"An error occurred: {e}")
+    print(f"Reading {args.input}...")
+    try:
+        written = filter_tsc(args.input, output_file, grade=args.grade, start=args.start, end=args.end,
+                             year=year, columns=args.columns, chunksize=args.chunksize)
+        if written > 0:
+            print(f"Successfully saved {written} rows to {output_file}")
+        else:
+            print("No data found matching criteria. Output file not created.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
@@ -0,0 +1,78 @@
+"""
+Shared loader for merged LF data.
+
+Reads either the partitioned Parquet dataset written by
+`load-lf-excel.py --parquet-dir` or the merged CSV. With Parquet only the
+requested partitions (source_year / source_month / source_lf) and columns are
+read from disk; with CSV the same selection is applied after reading. Column
+types follow schemas.LF_SCHEMA (categoricals, small integers); measurements stay
+float64 by default so the outlier bounds and counts do not depend on the loader.
+
+Usage:
+    from lf_dataset import load_lf_data, default_lf_path
+    df = load_lf_data(default_lf_path(), columns=['nhiet_do_ra_thep', 'Al'], years=[2025], months=[11, 12])
+"""
+
+import os
+
+import pandas as pd
+
+from schemas import LF_SCHEMA, apply_schema, read_typed_csv
+
+PARTITION_COLUMNS = ['source_year', 'source_month', 'source_lf']
+
+
+def default_lf_path(base='merged_lf_data'):
+    """Prefer `<base>.parquet` (dataset directory) over `<base>.csv` when it exists."""
+    parquet_path = base + '.parquet'
+    return parquet_path if os.path.isdir(parquet_path) else base + '.csv'
+
+
+def _as_list(values):
+    if values is None:
+        return None
+    if isinstance(values, (int, str)):
+        return [values]
+    return list(values)
+
+
+def load_lf_data(path, columns=None, years=None, months=None, lfs=None, float_dtype='float64'):
+    """
+    Load merged LF data, optionally restricted to some partitions and columns.
+
+    Args:
+        path (str): Parquet dataset directory or merged CSV file.
+        columns (list of str, optional): Columns to return (default: all).
+        years, months, lfs (int or list of int, optional): Keep only these
+            source_year / source_month / source_lf values.
+        float_dtype (str): Type of the measurement columns; 'float32' halves their
+            memory but rounds the values the outlier bounds are compared with.
+
+    Returns:
+        pd.DataFrame
+    """
+    selection = {
+        'source_year': _as_list(years),
+        'source_month': _as_list(months),
+        'source_lf': _as_list(lfs),
+    }
+    selection = {col: values for col, values in selection.items() if values is not None}
+
+    if os.path.isdir(path):
+        filters = [(col, 'in', [int(v) for v in values]) for col, values in selection.items()]
+        df = pd.read_parquet(path, columns=columns, filters=filters or None)
+        # Partition keys come back as categoricals
+        for col in PARTITION_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col].astype('object'), errors='coerce')
+        return apply_schema(df, LF_SCHEMA, float_dtype)
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + list(selection)))
+    df = read_typed_csv(path, LF_SCHEMA, usecols=usecols, float_dtype=float_dtype)
+    for col, values in selection.items():
+        df = df[df[col].isin(values)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
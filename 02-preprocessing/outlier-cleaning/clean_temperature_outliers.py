@@ -2,12 +2,16 @@
 Script để phát hiện và xử lý outliers trong dữ liệu nhiệt độ LF
 """
 
-import pandas as pd
+import os
+import sys
 import numpy as np
 
-# Load data
-file_path = 'merged_lf_data.csv'
-df = pd.read_csv(file_path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lf_dataset import load_lf_data, default_lf_path
+
+# Load data (merged_lf_data.parquet dataset if present, else merged_lf_data.csv)
+file_path = default_lf_path()
+df = load_lf_data(file_path)
 
 print("=" * 80)
 print("PHÂN TÍCH VÀ XỬ LÝ OUTLIERS - NHIET_DO_RA_THEP")
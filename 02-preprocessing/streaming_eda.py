@@ -0,0 +1,142 @@
+"""
+Single-pass EDA for CSV files larger than memory.
+
+Reads the CSV in chunks and, for every numeric column, accumulates count, mean,
+variance, min/max, null counts, approximate quartiles (bottom-k sample) and a
+histogram (see sketches.py). Writes the same artifacts as the in-memory EDA:
+eda_summary.txt (Shape / Head / Describe, plus null counts) and eda_histograms.png.
+
+Usage:
+    python streaming_eda.py -i ../01-data/TSC_clean.csv
+    python streaming_eda.py -i ../merged_lf_data.csv --chunksize 100000 --sample-size 50000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from sketches import QuantileSketch, RunningMoments, StreamingHistogram
+
+DESCRIBE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def streaming_profile(input_path, chunksize=200_000, sample_size=10_000, hist_bins=1024):
+    """
+    Profile a CSV in one pass over its chunks.
+
+    Numeric columns are taken from the dtypes of the first chunk; later chunks are
+    coerced to numbers (unparsable values count as null).
+
+    Returns:
+        dict with keys: n_rows, columns, head, numeric_columns, null_counts (Series),
+        moments (RunningMoments), quantiles (QuantileSketch), histograms (StreamingHistogram).
+    """
+    profile = None
+    for chunk in pd.read_csv(input_path, chunksize=chunksize, low_memory=False):
+        if profile is None:
+            numeric_columns = chunk.select_dtypes(include='number').columns.tolist()
+            n_numeric = len(numeric_columns)
+            profile = {
+                'n_rows': 0,
+                'columns': chunk.columns.tolist(),
+                'head': chunk.head(),
+                'numeric_columns': numeric_columns,
+                'null_counts': pd.Series(0, index=chunk.columns, dtype='int64'),
+                'moments': RunningMoments(n_numeric),
+                'quantiles': QuantileSketch(n_numeric, k=sample_size),
+                'histograms': StreamingHistogram(n_numeric, n_bins=hist_bins),
+            }
+
+        values = chunk[profile['numeric_columns']].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+        profile['n_rows'] += len(chunk)
+        nulls = chunk.isna().sum()
+        # Numeric columns: count the coerced values, so unparsable text is a null too
+        nulls[profile['numeric_columns']] = np.isnan(values).sum(axis=0)
+        profile['null_counts'] += nulls.reindex(profile['null_counts'].index, fill_value=0)
+        profile['moments'].update(values)
+        profile['quantiles'].update(values)
+        profile['histograms'].update(values)
+
+    if profile is None:
+        raise ValueError(f"{input_path} has no rows")
+    return profile
+
+
+def describe_frame(profile):
+    """Same layout as DataFrame.describe() for the numeric columns."""
+    moments = profile['moments']
+    quartiles = profile['quantiles'].quantiles(DESCRIBE_QUANTILES)
+    has_values = moments.count > 0
+    rows = {
+        'count': moments.count.astype('float64'),
+        'mean': np.where(has_values, moments.mean, np.nan),
+        'std': moments.std,
+        'min': np.where(has_values, moments.min, np.nan),
+        '25%': quartiles[0],
+        '50%': quartiles[1],
+        '75%': quartiles[2],
+        'max': np.where(has_values, moments.max, np.nan),
+    }
+    return pd.DataFrame(rows, index=profile['numeric_columns']).T
+
+
+def write_summary(profile, output_path):
+    with pd.option_context('display.width', 10_000, 'display.max_columns', None):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("--- Shape ---\n")
+            f.write(f"{(profile['n_rows'], len(profile['columns']))}\n\n")
+            f.write("--- Head ---\n")
+            f.write(f"{profile['head']}\n\n")
+            f.write("--- Describe ---\n")
+            f.write(f"{describe_frame(profile)}\n\n")
+            f.write("--- Null Counts ---\n")
+            f.write(f"{profile['null_counts'].to_string()}\n")
+
+
+def plot_histograms(profile, output_path, bins=30, n_cols=3):
+    """One bar histogram per numeric column over its [min, max], like DataFrame.hist(bins=30)."""
+    columns = profile['numeric_columns']
+    moments, histograms = profile['moments'], profile['histograms']
+    n_rows = max(-(-len(columns) // n_cols), 1)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(20, 15), squeeze=False)
+
+    for j, ax in enumerate(axes.flat):
+        if j >= len(columns):
+            ax.set_visible(False)
+            continue
+        ax.set_title(columns[j])
+        ax.grid(True)
+        if moments.count[j] == 0:
+            continue
+        counts, edges = histograms.rebin(j, bins, (moments.min[j], moments.max[j]))
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge')
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-pass, chunked EDA summary and histograms for a CSV.")
+    parser.add_argument("-i", "--input", default="../01-data/TSC_clean.csv")
+    parser.add_argument("--summary", default="eda_summary.txt", help="Summary text output")
+    parser.add_argument("--histograms", default="eda_histograms.png", help="Histogram figure output")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="Rows per chunk")
+    parser.add_argument("--sample-size", type=int, default=10_000,
+                        help="Values kept per column for the quartiles (rank error ~ 1/sqrt(n))")
+    parser.add_argument("--bins", type=int, default=30, help="Bars per histogram")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"Profiling {args.input} in chunks of {args.chunksize} rows...")
+    profile = streaming_profile(args.input, chunksize=args.chunksize, sample_size=args.sample_size)
+    print(f"  -> {profile['n_rows']} rows, {len(profile['numeric_columns'])} numeric columns "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    write_summary(profile, args.summary)
+    print(f"Summary saved to {args.summary}")
+    plot_histograms(profile, args.histograms, bins=args.bins)
+    print(f"Histograms saved to {args.histograms}")
@@ -2,21 +2,53 @@ import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import PolynomialFeatures
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor
+from threadpoolctl import threadpool_limits
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import multiprocessing as mp
+import argparse
+import hashlib
+import inspect
+import json
 import os
+import pickle
+import re
+import threading
+import time
+import psutil
+import sys
 
-def load_and_process_data(file_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '02-preprocessing'))
+import schemas
+from schemas import TSC_SCHEMA, memory_report, read_typed_csv
+
+FEATURES = ['temperature', 'PROD_COUNTER', 'Time_In_Ladle']
+TARGET = 'speed'
+# Model inputs stay float64 so the features fed to train_models do not depend on the schema's float32
+MODEL_SCHEMA = {**TSC_SCHEMA, 'speed': 'float64', 'temperature': 'float64'}
+
+# Bump when the meaning of the features changes without a code change (e.g. new source semantics);
+# edits to load_and_process_data or schemas.py already invalidate the feature cache through their source hash
+FEATURE_VERSION = 1
+# Columns kept in the cached feature table
+FEATURE_TABLE_COLUMNS = ['HEAT_ID', 'STEEL_GRADE_NAME', 'CUT_DATE', 'START_DATE'] + FEATURES + [TARGET]
+
+def load_and_process_data(file_path, columns=None):
+    """Load TSC_clean, keep the target grade and engineer Time_In_Ladle (columns: optional usecols)."""
     # Load data
     print(f"Loading data from {file_path}...")
+    usecols = None if columns is None else (lambda c: c in columns)
     try:
-        df = pd.read_csv(file_path, parse_dates=['CUT_DATE', 'START_DATE'], low_memory=False)
+        df = read_typed_csv(file_path, MODEL_SCHEMA, usecols=usecols)
     except Exception as e:
         print(f"Error loading CSV: {e}")
         return None
+    memory_report(df, os.path.basename(file_path))
     
     # Filter Grade
     target_grade = 'sae1006'
@@ -36,10 +68,7 @@ def load_and_process_data(file_path):
     df = df[(df['speed'] > 0) & (df['temperature'] >= 1500)]
     
     # Feature Engineering: Time_In_Ladle
-    # Ensure datetime conversion worked
-    df['CUT_DATE'] = pd.to_datetime(df['CUT_DATE'], errors='coerce')
-    df['START_DATE'] = pd.to_datetime(df['START_DATE'], errors='coerce')
-    df = df.dropna(subset=['CUT_DATE', 'START_DATE'])
+    # Dates are parsed by the schema loader (unparsable values -> NaT, dropped above)
     
     df['Time_In_Ladle'] = (df['CUT_DATE'] - df['START_DATE']).dt.total_seconds() / 60.0
     
@@ -49,6 +78,77 @@ def load_and_process_data(file_path):
     print(f"Data shape after cleaning and feature engineering: {df.shape}")
     return df
 
+def _file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def feature_cache_key(file_path, index):
+    """
+    Key of the feature table: SHA-256 of the source file plus a hash of FEATURE_VERSION,
+    MODEL_SCHEMA and the source code of load_and_process_data and schemas.py (the typed loader).
+
+    `index` (path -> mtime, size, sha256) lets an unchanged file skip re-hashing.
+    """
+    stat = os.stat(file_path)
+    entry = index.get(os.path.abspath(file_path))
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        data_hash = entry['sha256']
+    else:
+        data_hash = _file_sha256(file_path)
+        index[os.path.abspath(file_path)] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': data_hash}
+    code = (f"{FEATURE_VERSION}\n{FEATURE_TABLE_COLUMNS}\n{sorted(MODEL_SCHEMA.items())}\n"
+            f"{inspect.getsource(load_and_process_data)}\n{inspect.getsource(schemas)}")
+    code_hash = hashlib.sha256(code.encode()).hexdigest()
+    return f"{data_hash[:16]}-{code_hash[:12]}"
+
+def load_feature_table(file_path, cache_dir=None, rebuild=False):
+    """
+    Engineered feature table of a TSC_clean file, cached as Parquet.
+
+    The cache file is named after feature_cache_key, so it is rebuilt when the
+    source file or the feature code changes; older tables of the same source are
+    removed. Default cache_dir: .feature_cache next to the source file.
+
+    Returns:
+        pd.DataFrame with FEATURE_TABLE_COLUMNS (those present), or None if loading failed.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), '.feature_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, 'index.json')
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    key = feature_cache_key(file_path, index)
+    # Temp file + os.replace: an interrupted run cannot leave a truncated index or table
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(index_path + '.tmp', index_path)
+    table_path = os.path.join(cache_dir, f"{stem}-{key}.parquet")
+
+    if os.path.exists(table_path) and not rebuild:
+        print(f"Loading cached features from {table_path}...")
+        return pd.read_parquet(table_path)
+
+    df = load_and_process_data(file_path, columns=FEATURE_TABLE_COLUMNS)
+    if df is None:
+        return None
+    df = df[[c for c in FEATURE_TABLE_COLUMNS if c in df.columns]].reset_index(drop=True)
+    df.to_parquet(table_path + '.tmp', index=False)
+    os.replace(table_path + '.tmp', table_path)
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}-") and name.endswith('.parquet') and name != os.path.basename(table_path):
+            os.remove(os.path.join(cache_dir, name))
+    print(f"Saved feature table to {table_path}")
+    return df
+
 def remove_outliers_iqr(df, columns):
     df_out = df.copy()
     for col in columns:
@@ -61,47 +161,198 @@ def remove_outliers_iqr(df, columns):
             df_out = df_out[(df_out[col] >= lower) & (df_out[col] <= upper)]
     return df_out
 
-def train_models(df):
-    features = ['temperature', 'PROD_COUNTER', 'Time_In_Ladle']
-    target = 'speed'
-    
-    X = df[features]
-    y = df[target]
-    
-    print(f"Training on features: {features}")
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
+def load_tuned_params(path='tuning_results.json'):
+    """Best parameters per model name from hyperparameter_search.py ({} if the file does not exist)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {name: result['best_params'] for name, result in json.load(f)['models'].items()}
+
+def candidate_models(tuned_params=None):
+    """
+    Models compared by train_models; n_jobs is each model's own thread count (-1 = all cores).
+
+    tuned_params (name -> params, see load_tuned_params) overrides the defaults of the named models.
+    """
     models = {
         "Polynomial Regression (Deg 2)": Pipeline([
             ('poly', PolynomialFeatures(degree=2)),
             ('linear', LinearRegression())
         ]),
         "Random Forest": RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1),
-        "XGBoost": xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100, random_state=42)
+        "XGBoost": xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100, random_state=42, n_jobs=-1)
     }
+    for name, params in (tuned_params or {}).items():
+        if name in models:
+            models[name].set_params(**params)
+    return models
+
+def model_threads(model, budget):
+    """Threads a model will use, from its n_jobs (joblib semantics), capped at the budget."""
+    n_jobs = model.get_params().get('n_jobs')
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        n_jobs = budget + 1 + n_jobs
+    return max(1, min(n_jobs, budget))
+
+def model_filename(name):
+    """File name of a saved model, e.g. 'Random Forest' -> 'random_forest.pkl'."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') + '.pkl'
+
+def _fit_and_evaluate(name, model, threads, X_train, y_train, X_test, y_test, n_single=100, model_dir=None):
+    """Worker process: fit one model, return accuracy and cost metrics (and save it to model_dir)."""
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=threads)
+
+    proc = psutil.Process()
+    baseline = proc.memory_info().rss
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], proc.memory_info().rss)
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    # BLAS/OpenMP pools of the worker follow the same thread count
+    with threadpool_limits(limits=threads):
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        batch_time = time.perf_counter() - start
+
+        # One heat at a time, as the notebook predicts for a single operating point
+        single = []
+        for i in range(min(n_single, len(X_test))):
+            row = X_test.iloc[[i]]
+            start = time.perf_counter()
+            model.predict(row)
+            single.append(time.perf_counter() - start)
+    done.set()
+    sampler.join()
+
+    blob = pickle.dumps(model)
+    model_path = None
+    if model_dir:
+        model_path = os.path.join(model_dir, model_filename(name))
+        with open(model_path, 'wb') as f:
+            f.write(blob)
+
+    return {
+        'model': name,
+        'threads': threads,
+        'MAE': mean_absolute_error(y_test, y_pred),
+        'MSE': mean_squared_error(y_test, y_pred),
+        'R2': r2_score(y_test, y_pred),
+        'fit_time_s': fit_time,
+        'predict_us_per_row': batch_time / len(X_test) * 1e6,
+        'single_row_latency_ms': float(np.median(single)) * 1e3,
+        'peak_memory_mb': (peak[0] - baseline) / 1024 ** 2,
+        'model_size_kb': len(blob) / 1024,
+        'model_path': model_path,
+    }
+
+def train_models(df, models=None, n_jobs=None, report_path=None, model_dir=None):
+    """
+    Fit the candidate models in parallel worker processes and compare accuracy and cost.
+
+    Models run concurrently as long as the sum of their thread counts fits in the
+    budget (n_jobs, default: all cores); each model keeps its own n_jobs, capped at
+    the budget. Every model is fitted in a fresh process, so peak memory is per model.
+
+    Args:
+        df (pd.DataFrame): Cleaned data with FEATURES and TARGET.
+        models (dict, optional): name -> estimator (default: candidate_models()).
+        n_jobs (int, optional): Thread budget shared by the running models.
+        report_path (str, optional): Write the results as JSON.
+        model_dir (str, optional): Save each fitted model there as a pickle (see model_filename).
+
+    Returns:
+        dict: name -> metrics (MAE, MSE, R2, fit time, predict latency, peak memory, model size).
+    """
+    X = df[FEATURES]
+    y = df[TARGET]
+    
+    print(f"Training on features: {FEATURES}")
     
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    
+    models = candidate_models() if models is None else models
+    if model_dir:
+        os.makedirs(model_dir, exist_ok=True)
+    budget = n_jobs or os.cpu_count()
+    # Biggest thread users first, small ones fill the remaining cores
+    pending = sorted(((name, model, model_threads(model, budget)) for name, model in models.items()),
+                     key=lambda item: -item[2])
+
     results = {}
-    for name, model in models.items():
-        print(f"\nTraining {name}...")
-        try:
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            mse = mean_squared_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
-            results[name] = {'MSE': mse, 'R2': r2}
-            print(f"  MSE: {mse:.4f}, R2: {r2:.4f}")
-        except Exception as e:
-            print(f"  Error training {name}: {e}")
+    running = {}
+    free = budget
+    # spawn + one task per child: a fresh process per model (clean peak RSS, no forked thread pools)
+    with ProcessPoolExecutor(max_workers=len(models), mp_context=mp.get_context('spawn'),
+                             max_tasks_per_child=1) as executor:
+        while pending or running:
+            for item in list(pending):
+                name, model, threads = item
+                if threads <= free or not running:
+                    print(f"\nTraining {name} ({threads} threads)...")
+                    future = executor.submit(_fit_and_evaluate, name, model, threads,
+                                             X_train, y_train, X_test, y_test, model_dir=model_dir)
+                    running[future] = item
+                    free -= threads
+                    pending.remove(item)
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, _, threads = running.pop(future)
+                free += threads
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  Error training {name}: {e}")
+                    continue
+                results[name] = result
+                print(f"  {name}: MAE: {result['MAE']:.4f}, MSE: {result['MSE']:.4f}, R2: {result['R2']:.4f}, "
+                      f"fit {result['fit_time_s']:.2f}s, {result['single_row_latency_ms']:.2f} ms/row, "
+                      f"{result['peak_memory_mb']:.0f} MB peak, {result['model_size_kb']:.0f} KB")
+
+    if report_path:
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'features': FEATURES,
+            'target': TARGET,
+            'n_train': len(X_train),
+            'n_test': len(X_test),
+            'thread_budget': budget,
+            'models': [results[name] for name in models if name in results],
+        }
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"\nSaved model report to: {report_path}")
         
     return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and compare casting-speed models.")
     # Absolute path based on user context
-    file_path = r"e:\OneDrive - hoaphat.com.vn\Code\ai-loss\01-data\TSC_clean.csv"
+    parser.add_argument("-i", "--input", default=r"e:\OneDrive - hoaphat.com.vn\Code\ai-loss\01-data\TSC_clean.csv")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Thread budget shared by the models (default: all cores)")
+    parser.add_argument("--report", default="model_report.json", help="JSON report of accuracy and cost per model")
+    parser.add_argument("--model-dir", default="models", help="Directory for the fitted models (pickle)")
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild the cached feature table")
+    parser.add_argument("--tuned", default="tuning_results.json",
+                        help="Best parameters from hyperparameter_search.py (used if the file exists)")
+    args = parser.parse_args()
+    file_path = args.input
     
     if os.path.exists(file_path):
-        df = load_and_process_data(file_path)
+        df = load_feature_table(file_path, rebuild=args.no_cache)
         
         if df is not None and not df.empty:
             cols_to_filter = ['speed', 'temperature', 'Time_In_Ladle']
@@ -109,7 +360,11 @@ if __name__ == "__main__":
             print(f"Data shape after outlier removal: {df_clean.shape}")
             
             if not df_clean.empty:
-                train_models(df_clean)
+                tuned = load_tuned_params(args.tuned)
+                if tuned:
+                    print(f"Using tuned parameters from {args.tuned} for: {', '.join(tuned)}")
+                train_models(df_clean, models=candidate_models(tuned), n_jobs=args.jobs, report_path=args.report,
+                             model_dir=args.model_dir)
             else:
                 print("Dataframe is empty after outlier removal.")
         else:
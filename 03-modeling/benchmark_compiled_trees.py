@@ -0,0 +1,114 @@
+"""
+Benchmark compiled tree ensembles (compiled_trees.py) against native predict().
+
+Trains the notebook's tuned RandomForest (200 trees, depth 20) and XGBoost
+(300 trees, depth 7) on synthetic heats, compiles both, saves and memory-maps
+them, checks that the outputs are identical, then measures batch throughput
+(rows/sec), single-row latency (a 1-row DataFrame for native predict, as in the
+notebook) and load time (unpickle vs. memory-map).
+
+Example:
+    python benchmark_compiled_trees.py
+    python benchmark_compiled_trees.py --rows 200000 --batch 100000 --single 500
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+
+from advanced_modeling import FEATURES
+from compiled_trees import compile_model, load_compiled
+
+
+def make_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'temperature': rng.normal(1565, 10, n_rows),
+        'PROD_COUNTER': rng.integers(1, 40, n_rows).astype(float),
+        'Time_In_Ladle': rng.uniform(10, 90, n_rows),
+    })[FEATURES]
+    y = 3 - 0.01 * (X['temperature'] - 1565) - 0.005 * X['Time_In_Ladle'] + rng.normal(0, 0.05, n_rows)
+    return X, y
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def single_row_ms(predict, rows):
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        predict(row)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(np.array(latencies) * 1e3, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled vs. native tree ensemble prediction.")
+    parser.add_argument("--rows", type=int, default=50_000, help="Training rows")
+    parser.add_argument("--batch", type=int, default=100_000, help="Rows for the throughput test")
+    parser.add_argument("--single", type=int, default=200, help="Single-row predictions")
+    args = parser.parse_args()
+
+    X, y = make_frame(args.rows)
+    X_batch, _ = make_frame(args.batch, seed=1)
+    models = {
+        'Random Forest': RandomForestRegressor(n_estimators=200, min_samples_split=50, min_samples_leaf=10,
+                                               max_features='log2', max_depth=20, random_state=42),
+        'XGBoost': xgb.XGBRegressor(subsample=0.7, n_estimators=300, max_depth=7, learning_rate=0.1,
+                                    colsample_bytree=0.7),
+    }
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, model in models.items():
+            print(f"Training {name}...")
+            model.fit(X, y)
+            pickle_path = os.path.join(tmp, f'{name}.pkl')
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(model, f)
+            compiled_path = compile_model(model).save(os.path.join(tmp, f'{name}.trees'))
+
+            load_native = best_of(lambda: pickle.load(open(pickle_path, 'rb')))
+            load_mmap = best_of(lambda: load_compiled(compiled_path))
+            compiled = load_compiled(compiled_path)
+
+            native_pred = model.predict(X_batch)
+            compiled_pred = compiled.predict(X_batch.to_numpy())
+            max_diff = float(np.abs(native_pred - compiled_pred).max())
+
+            native_batch = best_of(lambda: model.predict(X_batch))
+            compiled_batch = best_of(lambda: compiled.predict(X_batch.to_numpy()))
+
+            single = [X_batch.iloc[[i]] for i in range(args.single)]
+            native_p50, native_p99 = single_row_ms(model.predict, single)
+            arrays = [row.to_numpy() for row in single]
+            compiled_p50, compiled_p99 = single_row_ms(compiled.predict, arrays)
+
+            rows.append({
+                'model': name, 'nodes': len(compiled.value), 'max_abs_diff': max_diff,
+                'native_rows_per_s': args.batch / native_batch, 'compiled_rows_per_s': args.batch / compiled_batch,
+                'native_p50_ms': native_p50, 'compiled_p50_ms': compiled_p50,
+                'native_p99_ms': native_p99, 'compiled_p99_ms': compiled_p99,
+                'unpickle_ms': load_native * 1e3, 'mmap_load_ms': load_mmap * 1e3,
+            })
+
+    report = pd.DataFrame(rows).set_index('model').T
+    print("\n", report.to_string(float_format=lambda v: f"{v:,.4g}"))
+
+
+if __name__ == "__main__":
+    main()
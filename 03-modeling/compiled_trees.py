@@ -0,0 +1,262 @@
+"""
+Tree ensembles (RandomForestRegressor, XGBRegressor) compiled to flat NumPy arrays.
+
+All nodes of all trees are stored in contiguous arrays indexed by a global node id:
+
+    feature     int32    split feature (0 for leaves)
+    threshold   float64  split value (+inf for leaves)
+    left        int32    left child; the right child is left + 1; leaves point to themselves
+    missing     int32    child taken for NaN (XGBoost default direction, sklearn missing_go_to_left)
+    value       float64  leaf value
+    roots       int32    root node of every tree
+
+Nodes are renumbered so that the two children of a split are adjacent, and the
+next node is left + (x does not go left): one gather for the feature, one for the
+threshold and one for the child per level. Prediction walks all rows through all
+trees at once on an (n_rows, n_trees) array of node ids; since leaves point to
+themselves (x <= inf always goes "left"), it needs no per-node checks and stops
+once no node moves. Comparisons and the summation order follow the source
+library (sklearn: float32(x) <= threshold, mean of trees in order; XGBoost:
+float32(x) < threshold, float32 sum), so the outputs are identical to predict().
+
+This only helps single-row / small-batch latency (the prediction service): for
+large batches the native predict() is 3-8x faster (benchmark_compiled_trees.py:
+RF 5.9e4 vs 1.9e4 rows/s, XGBoost 2.6e5 vs 3.2e4 rows/s), so batch scoring should
+keep using the original model.
+
+A compiled model is saved as a directory of .npy files plus meta.json, and
+load_compiled memory-maps the arrays (no parse/unpickle step, pages shared
+between processes).
+
+Usage:
+    python compiled_trees.py models/random_forest.pkl models/xgboost.pkl    # -> models/*.trees
+
+    from compiled_trees import compile_model, load_compiled
+    compile_model(rf_model).save('models/random_forest.trees')
+    model = load_compiled('models/random_forest.trees')
+    speed = model.predict(X)
+"""
+
+import json
+import os
+
+import numpy as np
+
+ARRAYS = ('feature', 'threshold', 'left', 'missing', 'value', 'roots')
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+class CompiledEnsemble:
+    """Flat array form of a tree ensemble with a vectorized predict."""
+
+    def __init__(self, arrays, meta):
+        """
+        Args:
+            arrays (dict): ARRAYS name -> numpy array (or memmap).
+            meta (dict): kind ('sklearn' or 'xgboost'), aggregation ('mean' or 'sum'),
+                base_score, n_features, max_depth, feature_names.
+        """
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.strict = meta['kind'] == 'xgboost'     # x < threshold instead of x <= threshold
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaves(self, X):
+        """Leaf node id for every (row, tree)."""
+        n_rows, n_features = X.shape
+        has_nan = np.isnan(X).any()
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        flat = X.ravel()
+        for _ in range(self.meta['max_depth']):
+            x = flat[offsets + self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            go_right = x >= threshold if self.strict else x > threshold
+            children = self.left[nodes] + go_right
+            if has_nan:
+                nan = np.isnan(x)
+                children[nan] = self.missing[nodes[nan]]
+            if np.array_equal(children, nodes):
+                break
+            nodes = children
+        return nodes
+
+    def predict(self, X, chunk_size=2048):
+        """Predictions for a 2-D array / DataFrame with the training column order."""
+        # Compare in float32 like both libraries; +-inf -> +-max so that x <= inf holds at leaves
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        X = np.clip(X, -_FLOAT32_MAX, _FLOAT32_MAX).astype(np.float64)
+        out = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            values = self.value[self._leaves(X[start:start + chunk_size])]
+            # Accumulate tree by tree in the library's order and precision (cumsum is sequential)
+            if self.meta['kind'] == 'xgboost':
+                values = values.astype(np.float32)
+                values[:, 0] += np.float32(self.meta['base_score'])
+            total = np.cumsum(values, axis=1)[:, -1]
+            if self.meta['aggregation'] == 'mean':
+                total /= self.n_trees
+            out[start:start + len(total)] = total
+        return out.astype(np.float32) if self.meta['kind'] == 'xgboost' else out
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=1)
+        return path
+
+
+def load_compiled(path, mmap=True):
+    """Load a saved CompiledEnsemble; arrays are memory-mapped read-only unless mmap=False."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+              for name in ARRAYS}
+    return CompiledEnsemble(arrays, meta)
+
+
+def _adjacent_order(left, right):
+    """
+    New position of every node of one tree such that the children of each split are
+    adjacent (right = left + 1); the root stays at 0.
+    """
+    position = np.empty(len(left), dtype=np.int64)
+    position[0] = 0
+    queue = [0]
+    next_free = 1
+    for node in queue:           # grows while iterating: breadth-first
+        if left[node] >= 0:
+            position[left[node]], position[right[node]] = next_free, next_free + 1
+            next_free += 2
+            queue.extend((left[node], right[node]))
+    return position
+
+
+def _flatten(trees):
+    """
+    Renumber and concatenate per-tree nodes into the global arrays.
+
+    trees: list of dicts with feature, threshold, left, right, missing, value
+    (per-tree arrays, children = -1 for leaves).
+    """
+    parts = {name: [] for name in ARRAYS}
+    offset = 0
+    for tree in trees:
+        left = np.asarray(tree['left'], dtype=np.int64)
+        right = np.asarray(tree['right'], dtype=np.int64)
+        n = len(left)
+        leaf = left < 0
+        position = _adjacent_order(left, right) + offset
+        new = {}
+        new['feature'] = np.where(leaf, 0, tree['feature'])
+        new['threshold'] = np.where(leaf, np.inf, tree['threshold'])
+        new['left'] = np.where(leaf, position, position[np.where(leaf, 0, left)])
+        new['missing'] = np.where(leaf, position, position[np.where(leaf, 0, tree['missing'])])
+        new['value'] = np.where(leaf, tree['value'], 0.0)
+        for name, values in new.items():
+            ordered = np.empty(n, dtype=values.dtype)
+            ordered[position - offset] = values
+            parts[name].append(ordered)
+        parts['roots'].append([offset])
+        offset += n
+    dtypes = {'feature': np.int32, 'threshold': np.float64, 'left': np.int32, 'missing': np.int32,
+              'value': np.float64, 'roots': np.int32}
+    return {name: np.concatenate(parts[name]).astype(dtypes[name]) for name in ARRAYS}
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):      # children always have larger ids than their parent
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def compile_sklearn_forest(model):
+    """RandomForestRegressor / ExtraTreesRegressor -> CompiledEnsemble (mean of trees)."""
+    trees = []
+    max_depth = 0
+    for estimator in model.estimators_:
+        t = estimator.tree_
+        # sklearn >= 1.3 routes NaN per node (also for features without NaN in training)
+        go_left = np.asarray(getattr(t, 'missing_go_to_left', np.zeros(t.node_count)), dtype=bool)
+        trees.append({
+            'feature': t.feature, 'threshold': t.threshold,
+            'left': t.children_left, 'right': t.children_right,
+            'missing': np.where(go_left, t.children_left, t.children_right),
+            'value': t.value[:, 0, 0],
+        })
+        max_depth = max(max_depth, t.max_depth)
+    meta = {
+        'kind': 'sklearn', 'aggregation': 'mean', 'base_score': 0.0, 'max_depth': max_depth,
+        'n_features': int(model.n_features_in_),
+        'feature_names': [str(c) for c in getattr(model, 'feature_names_in_', [])],
+    }
+    return CompiledEnsemble(_flatten(trees), meta)
+
+
+def compile_xgboost(model):
+    """XGBRegressor (gbtree, single target) -> CompiledEnsemble (base_score + sum of trees)."""
+    booster = model.get_booster()
+    learner = json.loads(bytes(booster.save_raw('json')))['learner']
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    trees = []
+    max_depth = 0
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        default_left = np.asarray(tree['default_left'], dtype=bool)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        trees.append({
+            'feature': np.asarray(tree['split_indices']), 'threshold': conditions,
+            'left': left, 'right': right, 'missing': np.where(default_left, left, right),
+            'value': conditions,       # leaves keep their value in split_conditions
+        })
+        max_depth = max(max_depth, _tree_depth(left, right))
+    meta = {
+        'kind': 'xgboost', 'aggregation': 'sum', 'base_score': base_score, 'max_depth': max_depth,
+        'n_features': int(learner['learner_model_param']['num_feature']),
+        'feature_names': list(booster.feature_names or []),
+    }
+    return CompiledEnsemble(_flatten(trees), meta)
+
+
+def compile_model(model):
+    """Compile a fitted RandomForestRegressor or XGBRegressor."""
+    if hasattr(model, 'get_booster'):
+        return compile_xgboost(model)
+    if hasattr(model, 'estimators_'):
+        return compile_sklearn_forest(model)
+    raise TypeError(f"Cannot compile {type(model).__name__}: expected a tree ensemble")
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Compile pickled tree ensembles to memory-mappable arrays.")
+    parser.add_argument("models", nargs='+', help="Pickles saved by advanced_modeling.py (--model-dir)")
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        try:
+            compiled = compile_model(model)
+        except TypeError as e:
+            print(f"⚠️ Skipped {model_path}: {e}")
+            continue
+        out = compiled.save(os.path.splitext(model_path)[0] + '.trees')
+        print(f"✅ {model_path} -> {out} ({compiled.n_trees} trees, {len(compiled.value)} nodes)")
@@ -0,0 +1,309 @@
+"""
+HYPERPARAMETER SEARCH WITH SUCCESSIVE HALVING
+=============================================
+
+Replaces the RandomizedSearchCV blocks of multiple-vars-modeling.ipynb (too slow
+to run, so their results were hard-coded). Random candidates from the same
+parameter grids are first cross-validated on a small subset of the rows; only
+the best 1/factor of them go on to the next rung, which has factor times more
+rows, until the survivors are evaluated on all rows.
+
+- Fold assignments are drawn once per search; the folds of every rung are cached
+  and nested (the rows of a rung are a prefix of one fixed permutation).
+- Every (candidate, rung, fold) fit is a separate task in a process pool, so the
+  wall-clock budget can stop the search between fits; the best candidate of the
+  highest completed rung is returned.
+
+Usage:
+    python hyperparameter_search.py -i ../01-data/TSC_clean.csv --budget 3600 -j 8
+    python advanced_modeling.py --tuned tuning_results.json      # uses the best parameters
+
+Outputs:
+    tuning_results.json   best parameters and MAE per model (read by advanced_modeling.py)
+    tuning_trials.csv     one row per candidate and rung (params, rows, MAE, fit time)
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterSampler
+
+from advanced_modeling import FEATURES, TARGET, load_feature_table, remove_outliers_iqr
+
+
+def search_spaces():
+    """name -> (estimator, parameter grid); grids from multiple-vars-modeling.ipynb, one thread per fit."""
+    return {
+        "Random Forest": (
+            RandomForestRegressor(random_state=42, n_jobs=1),
+            {
+                'n_estimators': [100, 200, 300],
+                'max_depth': [10, 15, 20, 25],
+                'min_samples_leaf': [10, 20, 50],
+                'min_samples_split': [20, 50, 100],
+                'max_features': ['sqrt', 'log2'],
+            },
+        ),
+        "XGBoost": (
+            xgb.XGBRegressor(objective='reg:squarederror', random_state=42, n_jobs=1),
+            {
+                'n_estimators': [100, 300, 500],
+                'learning_rate': [0.01, 0.05, 0.1],
+                'max_depth': [5, 7, 10],
+                'subsample': [0.7, 0.8, 0.9],
+                'colsample_bytree': [0.7, 0.8, 0.9],
+            },
+        ),
+    }
+
+
+class FoldCache:
+    """
+    Cross-validation folds of nested row subsets.
+
+    Rows are shuffled once and every row gets a fold id; the subset with n rows is
+    the first n rows of the permutation, so its folds are consistent with those of
+    all other subsets. The (train, test) index arrays are built once per size.
+    """
+
+    def __init__(self, n_rows, cv=3, random_state=42):
+        rng = np.random.default_rng(random_state)
+        self.order = rng.permutation(n_rows)
+        self.fold_of = np.arange(n_rows) % cv
+        self.cv = cv
+        self._cache = {}
+
+    def folds(self, n):
+        if n not in self._cache:
+            rows, fold_of = self.order[:n], self.fold_of[:n]
+            self._cache[n] = [(rows[fold_of != k], rows[fold_of == k]) for k in range(self.cv)]
+        return self._cache[n]
+
+
+# Worker state: the data is sent once per process instead of once per task
+_X = _y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_fold(estimator, params, train_idx, test_idx):
+    """Worker process: fit one candidate on one fold, return (MAE, fit seconds)."""
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(_X[train_idx], _y[train_idx])
+    fit_time = time.perf_counter() - start
+    return mean_absolute_error(_y[test_idx], model.predict(_X[test_idx])), fit_time
+
+
+def _collect(finished, timeout):
+    """Wait up to `timeout` seconds (None: forever) for the first finished fit, then take all finished ones."""
+    try:
+        done = [finished.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while True:
+        try:
+            done.append(finished.get_nowait())
+        except queue.Empty:
+            return done
+
+
+def successive_halving_search(estimator, param_space, X, y, n_candidates=20, factor=3, cv=3,
+                              min_rows=None, time_budget=None, n_jobs=None, random_state=42):
+    """
+    Random search with successive halving on growing row subsets, under a wall-clock budget.
+
+    Args:
+        estimator: Unfitted estimator (cloned for every fit).
+        param_space (dict): Parameter name -> list of values or distribution (as RandomizedSearchCV).
+        X, y: Training data (arrays or DataFrame/Series).
+        n_candidates (int): Random candidates in the first rung.
+        factor (int): Candidates kept per rung = 1/factor; rows per rung grow by factor.
+        cv (int): Folds per evaluation.
+        min_rows (int, optional): Rows of the first rung (default: all rows / factor^(rungs-1)).
+        time_budget (float, optional): Seconds; no new fits are started after it.
+        n_jobs (int, optional): Worker processes (default: all cores).
+        random_state (int): Seed of the candidates and the folds.
+
+    Returns:
+        (best_params, best_score, trials): best_score is the CV MAE of the best candidate
+        of the highest completed rung; trials is a DataFrame with one row per candidate and rung.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_rows = len(X)
+    candidates = list(ParameterSampler(param_space, n_candidates, random_state=random_state))
+    n_rungs = 1 + int(math.floor(math.log(len(candidates), factor))) if len(candidates) > 1 else 1
+    if min_rows is None:
+        min_rows = max(n_rows // factor ** (n_rungs - 1), 50 * cv)
+    fold_cache = FoldCache(n_rows, cv, random_state)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    trials = []
+    alive = list(range(len(candidates)))
+    best = None
+    max_workers = n_jobs or os.cpu_count()
+    # A pool of our own: fits still running at the deadline are stopped with terminate()
+    pool = mp.get_context('spawn').Pool(max_workers, initializer=_init_worker, initargs=(X, y))
+    finished = queue.Queue()        # (candidate, (MAE, fit seconds) or None, exception or None)
+    running = 0
+    try:
+        for rung in range(n_rungs):
+            n = n_rows if rung == n_rungs - 1 else min(n_rows, min_rows * factor ** rung)
+            folds = fold_cache.folds(n)
+            print(f"   rung {rung}: {len(alive)} candidates x {cv} folds on {n} rows")
+
+            scores = {c: [] for c in alive}
+            fit_times = {c: 0.0 for c in alive}
+            tasks = [(c, train_idx, test_idx) for c in alive for train_idx, test_idx in folds]
+            out_of_time = False
+            while tasks or running:
+                while tasks and running < max_workers and not out_of_time:
+                    c, train_idx, test_idx = tasks.pop(0)
+                    pool.apply_async(_fit_fold, (estimator, candidates[c], train_idx, test_idx),
+                                     callback=lambda result, c=c: finished.put((c, result, None)),
+                                     error_callback=lambda error, c=c: finished.put((c, None, error)))
+                    running += 1
+                if not running:
+                    break
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done = _collect(finished, timeout)
+                for c, result, error in done:
+                    running -= 1
+                    if error is not None:
+                        raise error
+                    mae, fit_time = result
+                    scores[c].append(mae)
+                    fit_times[c] += fit_time
+                if deadline is not None and time.monotonic() >= deadline:
+                    # Stop starting fits; the ones already running are terminated below
+                    out_of_time = True
+                    tasks = []
+                    if not done:
+                        break
+
+            complete = [c for c in alive if len(scores[c]) == cv]
+            for c in alive:
+                trials.append({
+                    'candidate': c,
+                    'rung': rung,
+                    'n_rows': n,
+                    'params': json.dumps(candidates[c], default=str),
+                    'mae_mean': np.mean(scores[c]) if scores[c] else np.nan,
+                    'mae_std': np.std(scores[c]) if scores[c] else np.nan,
+                    'folds_done': len(scores[c]),
+                    'fit_time_s': fit_times[c],
+                })
+            if complete:
+                ranked = sorted(complete, key=lambda c: np.mean(scores[c]))
+                best = (candidates[ranked[0]], float(np.mean(scores[ranked[0]])))
+                alive = ranked[:max(1, math.ceil(len(ranked) / factor))]
+            if out_of_time:
+                print(f"   time budget reached during rung {rung}")
+                break
+    finally:
+        if running:
+            # Fits still running after the budget would compete with the next model for the cores
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+    if best is None:
+        raise RuntimeError("No candidate finished within the time budget")
+    return best[0], best[1], pd.DataFrame(trials)
+
+
+def _json_value(value):
+    """numpy scalars from the grids -> plain Python for JSON."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_search(df, models=None, n_candidates=20, factor=3, cv=3, time_budget=None, n_jobs=None,
+               results_path='tuning_results.json', trials_path='tuning_trials.csv'):
+    """
+    Tune every model of search_spaces() on the training split of train_models and save the results.
+
+    The wall-clock budget is shared: each model gets the time left divided by the
+    number of models still to tune.
+    """
+    from sklearn.model_selection import train_test_split
+    # Same split as train_models, so the test rows stay unseen by the search
+    X_train, _, y_train, _ = train_test_split(df[FEATURES], df[TARGET], test_size=0.2, random_state=42)
+
+    spaces = search_spaces()
+    names = models or list(spaces)
+    start = time.monotonic()
+    results = {}
+    all_trials = []
+    for i, name in enumerate(names):
+        estimator, space = spaces[name]
+        budget = None
+        if time_budget is not None:
+            budget = (time_budget - (time.monotonic() - start)) / (len(names) - i)
+        print(f"\nTuning {name}" + (f" (budget {budget:.0f}s)" if budget is not None else "") + "...")
+        try:
+            params, score, trials = successive_halving_search(estimator, space, X_train, y_train, n_candidates,
+                                                              factor, cv, time_budget=budget, n_jobs=n_jobs)
+        except RuntimeError as e:
+            print(f"  Skipped {name}: {e}")
+            continue
+        params = {k: _json_value(v) for k, v in params.items()}
+        results[name] = {'best_params': params, 'cv_mae': score, 'n_trials': len(trials)}
+        trials.insert(0, 'model', name)
+        all_trials.append(trials)
+        print(f"  best MAE {score:.4f}: {params}")
+
+    if not results:
+        # Keep the parameters of the previous search for advanced_modeling.py --tuned
+        print(f"\nNo model finished; {results_path} and {trials_path} left unchanged")
+        return results
+    with open(results_path, 'w') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'features': FEATURES,
+                   'n_train': len(X_train), 'models': results}, f, indent=1)
+    pd.concat(all_trials, ignore_index=True).to_csv(trials_path, index=False)
+    print(f"\nSaved best parameters to: {results_path}")
+    print(f"Saved trials log to: {trials_path}")
+    return results
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune RandomForest/XGBoost with successive halving.")
+    parser.add_argument("-i", "--input", default=r"e:\OneDrive - hoaphat.com.vn\Code\ai-loss\01-data\TSC_clean.csv")
+    parser.add_argument("--models", nargs='+', choices=list(search_spaces()), default=None)
+    parser.add_argument("--candidates", type=int, default=20, help="Random candidates per model")
+    parser.add_argument("--factor", type=int, default=3, help="Halving factor")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=None, help="Wall-clock budget in seconds for all models")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--results", default="tuning_results.json")
+    parser.add_argument("--trials", default="tuning_trials.csv")
+    args = parser.parse_args()
+
+    df = load_feature_table(args.input) if os.path.exists(args.input) else None
+    if df is None or df.empty:
+        print(f"No data loaded from: {args.input}")
+    else:
+        df_clean = remove_outliers_iqr(df, ['speed', 'temperature', 'Time_In_Ladle'])
+        print(f"Data shape after outlier removal: {df_clean.shape}")
+        run_search(df_clean, args.models, args.candidates, args.factor, args.cv, args.budget, args.jobs,
+                   args.results, args.trials)
@@ -0,0 +1,74 @@
+"""
+Load test for prediction_service.py on localhost.
+
+Sends single-row requests from several client threads (one keep-alive session
+each), then a few batch requests, and prints client-side throughput and p50/p99
+latency next to the server-side /metrics.
+
+Example:
+    python prediction_service.py --model models/xgboost.pkl &
+    python load_test_service.py --requests 5000 --concurrency 8 --batch-size 500
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+def random_rows(n, seed=0):
+    """Heats in the range of the sae1006 training data."""
+    rng = np.random.default_rng(seed)
+    return [{'temperature': float(t), 'PROD_COUNTER': int(p), 'Time_In_Ladle': float(m)}
+            for t, p, m in zip(rng.normal(1565, 10, n), rng.integers(1, 40, n), rng.uniform(20, 90, n))]
+
+
+def _client(url, rows):
+    session = requests.Session()
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        response = session.post(f"{url}/predict", json=row)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(url, n_requests, concurrency, batch_size, n_batches):
+    rows = random_rows(n_requests)
+    shards = [rows[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.concatenate([np.array(l) for l in executor.map(lambda s: _client(url, s), shards)])
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies * 1e3, [50, 99])
+    print(f"single: {n_requests} requests, {concurrency} clients, {n_requests / elapsed:.0f} req/s, "
+          f"p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+    session = requests.Session()
+    batch_latencies = []
+    for i in range(n_batches):
+        payload = {'rows': random_rows(batch_size, seed=i + 1)}
+        start = time.perf_counter()
+        session.post(f"{url}/predict/batch", json=payload).raise_for_status()
+        batch_latencies.append(time.perf_counter() - start)
+    if batch_latencies:
+        p50, p99 = np.percentile(np.array(batch_latencies) * 1e3, [50, 99])
+        print(f"batch:  {n_batches} x {batch_size} rows, p50 {p50:.2f} ms, p99 {p99:.2f} ms "
+              f"({p50 * 1e3 / batch_size:.1f} µs/row)")
+
+    print("server /metrics:", json.dumps(requests.get(f"{url}/metrics").json(), indent=1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the casting-speed prediction service.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--requests", type=int, default=5000, help="Single-row requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per batch request")
+    parser.add_argument("--batches", type=int, default=20, help="Batch requests")
+    args = parser.parse_args()
+    run(args.url, args.requests, args.concurrency, args.batch_size, args.batches)
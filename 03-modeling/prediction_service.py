@@ -0,0 +1,196 @@
+"""
+CASTING-SPEED PREDICTION SERVICE
+================================
+
+Flask service returning a speed suggestion per heat from a model saved by
+advanced_modeling.py (--model-dir). The model is unpickled once at startup and
+switched to one thread (joblib/OpenMP start-up costs more than a one-row
+prediction). Requests are copied into preallocated float buffers (one per
+server thread) instead of building a DataFrame per call.
+
+Endpoints:
+    POST /predict        {"temperature": 1565, "PROD_COUNTER": 12, "Time_In_Ladle": 48.5}
+                         -> {"speed": 3.12}
+    POST /predict/batch  {"rows": [{...}, {...}]}  or  {"temperature": [...], "PROD_COUNTER": [...], ...}
+                         -> {"speed": [3.12, 3.08]}
+    GET  /metrics        request counts and p50/p99 latency (ms) per endpoint
+    GET  /health
+
+Usage:
+    python prediction_service.py --model models/xgboost.pkl --port 5000
+    python prediction_service.py --model models/xgboost.trees      # compiled, see compiled_trees.py
+    python load_test_service.py --url http://127.0.0.1:5000 --requests 5000 --concurrency 8
+"""
+
+import argparse
+import os
+import pickle
+import threading
+import time
+import warnings
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from advanced_modeling import FEATURES
+from compiled_trees import load_compiled
+
+# Models fitted on a DataFrame warn on every array input; the column order is FEATURES
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class LatencyRecorder:
+    """Latencies of the last `size` requests per endpoint in fixed ring buffers."""
+
+    def __init__(self, size=10_000):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            if endpoint not in self.samples:
+                self.samples[endpoint] = np.empty(self.size)
+                self.counts[endpoint] = 0
+            self.samples[endpoint][self.counts[endpoint] % self.size] = seconds
+            self.counts[endpoint] += 1
+
+    def summary(self):
+        with self.lock:
+            report = {}
+            for endpoint, samples in self.samples.items():
+                count = self.counts[endpoint]
+                window = samples[:min(count, self.size)] * 1e3
+                p50, p99 = np.percentile(window, [50, 99])
+                report[endpoint] = {'count': count, 'p50_ms': p50, 'p99_ms': p99, 'max_ms': float(window.max())}
+            return report
+
+
+def _number(value, name):
+    """JSON numbers only: numeric strings ("1565") and booleans are rejected instead of coerced."""
+    if type(value) not in (int, float):
+        raise TypeError(f"{name} must be a number, got {type(value).__name__}")
+    return value
+
+
+def _check_finite(values):
+    """null/NaN/inf inputs are written as NaN and would silently follow the trees' missing-value branch."""
+    if not np.isfinite(values).all():
+        bad = sorted({FEATURES[j] for j in np.nonzero(~np.isfinite(values))[1]})
+        raise ValueError(f"Non-finite value (null, NaN or inf) in {bad}")
+
+
+class SpeedPredictor:
+    """Loaded model plus per-thread input buffers (1 row and max_batch rows)."""
+
+    def __init__(self, model_path, max_batch=10_000):
+        if os.path.isdir(model_path):
+            # Tree ensemble compiled with compiled_trees.py: memory-mapped arrays
+            self.model = load_compiled(model_path)
+        else:
+            with open(model_path, 'rb') as f:
+                self.model = pickle.load(f)
+            if 'n_jobs' in self.model.get_params():
+                self.model.set_params(n_jobs=1)
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+    def _buffers(self):
+        local = self._local
+        if not hasattr(local, 'row'):
+            local.row = np.empty((1, len(FEATURES)))
+            local.batch = np.empty((self.max_batch, len(FEATURES)))
+        return local
+
+    def predict_one(self, values):
+        row = self._buffers().row
+        for j, name in enumerate(FEATURES):
+            row[0, j] = _number(values[name], name)
+        _check_finite(row)
+        return float(self.model.predict(row)[0])
+
+    def predict_many(self, columns, n):
+        if n > self.max_batch:
+            raise ValueError(f"Batch of {n} rows exceeds max_batch={self.max_batch}")
+        if n == 0:
+            return []       # same answer for every model (some cannot predict on 0 rows)
+        batch = self._buffers().batch[:n]
+        for j, name in enumerate(FEATURES):
+            for value in columns[name]:
+                _number(value, name)
+            batch[:, j] = columns[name]
+        _check_finite(batch)
+        return self.model.predict(batch).tolist()
+
+
+def _batch_columns(payload):
+    """{"rows": [...]} or column lists -> (dict of column sequences, row count)."""
+    if 'rows' in payload:
+        rows = payload['rows']
+        if not isinstance(rows, list):
+            raise TypeError("rows must be a list of objects")
+        return {name: [row[name] for row in rows] for name in FEATURES}, len(rows)
+    columns = {name: payload[name] for name in FEATURES}
+    if not all(isinstance(values, list) for values in columns.values()):
+        raise TypeError("Batch features must be lists (or use {\"rows\": [...]})")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError("Feature lists must have the same length")
+    return columns, lengths.pop()
+
+
+def create_app(model_path, max_batch=10_000):
+    app = Flask(__name__)
+    predictor = SpeedPredictor(model_path, max_batch)
+    latency = LatencyRecorder()
+
+    @app.post('/predict')
+    def predict():
+        start = time.perf_counter()
+        try:
+            speed = predictor.predict_one(request.get_json(force=True))
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f"Expected numeric {FEATURES}: {e}"}), 400
+        latency.record('predict', time.perf_counter() - start)
+        return jsonify({'speed': speed})
+
+    @app.post('/predict/batch')
+    def predict_batch():
+        start = time.perf_counter()
+        try:
+            columns, n = _batch_columns(request.get_json(force=True))
+            speeds = predictor.predict_many(columns, n)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f"Expected numeric {FEATURES}: {e}"}), 400
+        latency.record('predict_batch', time.perf_counter() - start)
+        return jsonify({'speed': speeds})
+
+    @app.get('/metrics')
+    def metrics():
+        return jsonify(latency.summary())
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'model': predictor.model_path, 'features': FEATURES})
+
+    return app
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve casting-speed predictions over HTTP.")
+    parser.add_argument("--model", default="models/xgboost.pkl",
+                        help="Model saved by advanced_modeling.py, or a directory from compiled_trees.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-batch", type=int, default=10_000, help="Rows per batch request")
+    args = parser.parse_args()
+
+    app = create_app(args.model, args.max_batch)
+    print(f"🚀 Serving {args.model} on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
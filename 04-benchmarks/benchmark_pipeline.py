@@ -0,0 +1,444 @@
+"""
+END-TO-END PIPELINE BENCHMARK
+=============================
+
+Runs the pipeline stages on synthetic data (02-preprocessing/synthetic_data.py)
+of several sizes and records wall time, peak RSS and rows/sec per stage:
+
+    etl        ETL.build_tsc on REP_CCM_HEATS/PRODUCTS/PRODUCT_VARS + writing TSC.csv
+               (rows = input rows of the three exports)
+    lf_excel   load-lf-excel.py on one workbook per month and LF (written from the
+               synthetic LF table), merged CSV included (rows = LF rows)
+    outliers   OutlierDetector on the LF table: analyze_all_numeric_columns,
+               detect_multivariate_outliers, clean_data_iqr (rows = LF rows)
+    train      load_and_process_data on TSC.csv + train_models (rows = training rows)
+
+Every stage runs in a fresh process; peak RSS is sampled over the process and its
+children (parse and training workers). Each run is appended to a JSON history
+(commit, host, configuration, results) and compared with the baseline run (set
+with --set-baseline, otherwise the previous run with the same options) if it used
+the same models, -j, --chunksize and --seed: stages slower or using more memory than the baseline by
+more than --threshold are flagged as regressions (exit code 1 with
+--fail-on-regression).
+
+Usage:
+    python benchmark_pipeline.py --scales 1 10
+    python benchmark_pipeline.py --scales 1 10 --set-baseline
+    python benchmark_pipeline.py --scales 1 10 --stages etl outliers --threshold 0.15 --fail-on-regression
+    python benchmark_pipeline.py --scales 100 --work-dir /data/bench --models XGBoost    # keeps the data
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib.util
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import psutil
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, '02-preprocessing'))
+sys.path.insert(0, os.path.join(ROOT, '02-preprocessing', 'outlier-cleaning'))
+sys.path.insert(0, os.path.join(ROOT, '03-modeling'))
+
+import synthetic_data  # noqa: E402
+
+STAGES = ('etl', 'lf_excel', 'outliers', 'train')
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline_history.json')
+WORKBOOK_HEADER_ROWS = 4
+# Smaller absolute changes are noise (timer / allocator) and never flagged
+MIN_TIME_DELTA_S = 0.1
+MIN_RSS_DELTA_MB = 5
+# Runs are only compared with a baseline measured with the same values of these options
+COMPARABLE_CONFIG = ('models', 'jobs', 'chunksize', 'seed')
+
+
+def load_lf_excel_module():
+    spec = importlib.util.spec_from_file_location(
+        'load_lf_excel', os.path.join(ROOT, '00-scripts', 'load-lf-excel.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ============================================================================
+# DATA SETUP
+# ============================================================================
+
+def write_lf_workbooks(lf_csv, out_dir, chunksize=100_000):
+    """
+    Write the LF table as monthly workbooks 'YY.MM.LFn.xlsx' in the layout read by
+    load-lf-excel.py (4 header rows, 'stt' + 58 columns). The synthetic table is in
+    time order, so each month's workbooks are closed before the next month starts.
+    """
+    from openpyxl import Workbook
+
+    columns = load_lf_excel_module().LF_COLUMNS
+    os.makedirs(out_dir, exist_ok=True)
+    open_books = {}
+
+    def close_all():
+        for path, (wb, _, _) in open_books.items():
+            wb.save(path)
+        open_books.clear()
+
+    current_month = None
+    for chunk in pd.read_csv(lf_csv, chunksize=chunksize, dtype=str, keep_default_na=False):
+        for (year, month, lf), group in chunk.groupby(['source_year', 'source_month', 'source_lf'], sort=False):
+            if (year, month) != current_month:
+                close_all()
+                current_month = (year, month)
+            path = os.path.join(out_dir, f"{int(year) % 100:02d}.{int(month):02d}.LF{lf}.xlsx")
+            if path not in open_books:
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet('LF')
+                for i in range(WORKBOOK_HEADER_ROWS):
+                    ws.append([f'header {i}'] + [None] * (len(columns) - 1))
+                open_books[path] = (wb, ws, [0])
+            _, ws, counter = open_books[path]
+            values = group[columns[1:]].to_numpy()
+            for row in values:
+                counter[0] += 1
+                ws.append([counter[0]] + [_cell(v) for v in row])
+    close_all()
+    return sorted(glob.glob(os.path.join(out_dir, '*.xlsx')))
+
+
+def _cell(value):
+    if value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def prepare_data(work_dir, scale, seed, n_jobs, stages, chunksize):
+    """
+    Synthetic exports (+ LF workbooks, + TSC.csv for the train stage) for one scale;
+    reused when work_dir already has them. TSC.csv is built here, untimed, unless the
+    etl stage runs first and writes it.
+    """
+    data_dir = os.path.join(work_dir, f"scale_{scale:g}")
+    manifest_path = os.path.join(data_dir, synthetic_data.MANIFEST_FILE)
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('seed') != seed or not math.isclose(manifest.get('scale', -1), scale, rel_tol=1e-3):
+            manifest = None
+    tsc_path = os.path.join(data_dir, 'TSC.csv')
+    if manifest is None:
+        print(f"🏭 Generating scale {scale:g} in {data_dir}...")
+        manifest = synthetic_data.generate(data_dir, scale=scale, n_jobs=n_jobs, seed=seed)
+        # TSC.csv and the workbooks were built from the previous data
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tsc_path)
+        shutil.rmtree(os.path.join(data_dir, 'lf_excel'), ignore_errors=True)
+
+    excel_dir = os.path.join(data_dir, 'lf_excel')
+    if 'lf_excel' in stages and not glob.glob(os.path.join(excel_dir, '*.xlsx')):
+        print(f"📄 Writing LF workbooks for scale {scale:g}...")
+        write_lf_workbooks(os.path.join(data_dir, synthetic_data.TABLE_FILES['lf']), excel_dir)
+
+    if 'train' in stages and 'etl' not in stages and not os.path.exists(tsc_path):
+        print(f"🏭 Building TSC.csv for scale {scale:g}...")
+        stage_etl(data_dir, manifest, {'chunksize': chunksize})
+    return data_dir, manifest
+
+
+# ============================================================================
+# STAGES (each runs in a fresh process)
+# ============================================================================
+
+def stage_etl(data_dir, manifest, options):
+    import ETL
+    files = synthetic_data.TABLE_FILES
+    df = ETL.build_tsc(os.path.join(data_dir, files['vars']), os.path.join(data_dir, files['heats']),
+                       os.path.join(data_dir, files['products']), chunksize=options['chunksize'])
+    df.to_csv(os.path.join(data_dir, 'TSC.csv'), index=False)
+    return sum(manifest['rows'][t] for t in ('heats', 'products', 'vars'))
+
+
+def stage_lf_excel(data_dir, manifest, options):
+    # As a script: its parse pool needs an importable module (the file name has dashes)
+    files = sorted(glob.glob(os.path.join(data_dir, 'lf_excel', '*.xlsx')))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        command = [sys.executable, os.path.join(ROOT, '00-scripts', 'load-lf-excel.py'), *files,
+                   '-o', os.path.join(data_dir, 'lf_excel', 'merged_lf_data.csv'), '--cache-dir', cache_dir, '--force']
+        if options['jobs']:
+            command += ['-j', str(options['jobs'])]
+        subprocess.run(command, check=True, stdout=None if options['verbose'] else subprocess.DEVNULL)
+    return manifest['rows']['lf']
+
+
+def stage_outliers(data_dir, manifest, options):
+    from lf_dataset import load_lf_data
+    from comprehensive_outlier_cleaning import OutlierDetector
+    df = load_lf_data(os.path.join(data_dir, synthetic_data.TABLE_FILES['lf']))
+    detector = OutlierDetector(df)
+    detector.analyze_all_numeric_columns()
+    detector.detect_multivariate_outliers()
+    detector.clean_data_iqr()
+    return len(df)
+
+
+def stage_train(data_dir, manifest, options):
+    from advanced_modeling import candidate_models, load_and_process_data, train_models
+    tsc_path = os.path.join(data_dir, 'TSC.csv')
+    if not os.path.exists(tsc_path):
+        # Written by prepare_data or the etl stage; never built inside the timed train stage
+        raise FileNotFoundError(f"{tsc_path} not found (etl stage failed?)")
+    df = load_and_process_data(tsc_path)
+    models = candidate_models()
+    if options['models']:
+        models = {name: model for name, model in models.items() if name in options['models']}
+    train_models(df, models=models, n_jobs=options['jobs'])
+    return len(df)
+
+
+STAGE_FUNCTIONS = {'etl': stage_etl, 'lf_excel': stage_lf_excel, 'outliers': stage_outliers, 'train': stage_train}
+
+
+def _tree_rss(proc):
+    rss = proc.memory_info().rss
+    for child in proc.children(recursive=True):
+        with contextlib.suppress(psutil.Error):
+            rss += child.memory_info().rss
+    return rss
+
+
+def _run_stage(stage, data_dir, manifest, options, queue):
+    """Child process: run one stage, report (seconds, rows, peak RSS of the process tree) or the error."""
+    if not options['verbose']:
+        # Also silences the stage's own worker processes (they inherit the descriptor)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        sys.stdout = open(os.devnull, 'w')
+
+    proc = psutil.Process()
+    peak = [_tree_rss(proc)]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            with contextlib.suppress(psutil.Error):
+                peak[0] = max(peak[0], _tree_rss(proc))
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        rows = STAGE_FUNCTIONS[stage](data_dir, manifest, options)
+    except Exception as e:
+        done.set()
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+        return
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    queue.put({'seconds': elapsed, 'rows': rows, 'peak_rss_mb': peak[0] / 1024 ** 2})
+
+
+def run_isolated(stage, data_dir, manifest, options):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, data_dir, manifest, options, queue))
+    proc.start()
+    proc.join()
+    if queue.empty():
+        return {'error': f"process exited with code {proc.exitcode}"}
+    return queue.get()
+
+
+# ============================================================================
+# HISTORY AND REGRESSIONS
+# ============================================================================
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {'baseline': None, 'runs': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def baseline_run(history, config):
+    """The run marked as baseline, else the latest run with the same COMPARABLE_CONFIG (None if there is none)."""
+    for run in history['runs']:
+        if run['id'] == history.get('baseline'):
+            return run
+    for run in reversed(history['runs']):
+        if not config_mismatch(config, run):
+            return run
+    return None
+
+
+def config_mismatch(config, baseline):
+    """Options of COMPARABLE_CONFIG that differ between this run and the baseline."""
+    base_config = baseline.get('config', {})
+    return [key for key in COMPARABLE_CONFIG if base_config.get(key) != config.get(key)]
+
+
+def compare(results, baseline, threshold):
+    """
+    Relative change of time and peak RSS per (stage, scale) against the baseline.
+
+    Returns:
+        list of dict: One row per result with time_change / rss_change (None without a
+        baseline measurement) and regression (True if either grew by more than threshold
+        and by more than MIN_TIME_DELTA_S / MIN_RSS_DELTA_MB).
+    """
+    reference = {(r['stage'], r['scale']): r for r in (baseline or {}).get('results', []) if 'seconds' in r}
+    rows = []
+    for result in results:
+        base = reference.get((result['stage'], result['scale']))
+        row = dict(result, time_change=None, rss_change=None, regression=False)
+        if base is not None and 'seconds' in result:
+            row['time_change'] = result['seconds'] / base['seconds'] - 1
+            row['rss_change'] = result['peak_rss_mb'] / base['peak_rss_mb'] - 1
+            slower = row['time_change'] > threshold and result['seconds'] - base['seconds'] > MIN_TIME_DELTA_S
+            bigger = (row['rss_change'] > threshold
+                      and result['peak_rss_mb'] - base['peak_rss_mb'] > MIN_RSS_DELTA_MB)
+            row['regression'] = slower or bigger
+        rows.append(row)
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def host_info():
+    return {'node': platform.node(), 'platform': platform.platform(), 'python': platform.python_version(),
+            'cpu_count': os.cpu_count(), 'memory_gb': round(psutil.virtual_memory().total / 1024 ** 3, 1)}
+
+
+def print_report(rows, baseline, threshold):
+    if baseline:
+        print(f"\nBaseline: run {baseline['id']} (commit {baseline.get('commit')}), threshold {threshold:.0%}")
+    print(f"\n{'Stage':<10} {'Scale':>6} {'Rows':>12} {'Seconds':>9} {'Rows/s':>12} {'Peak MB':>9} "
+          f"{'Δ time':>8} {'Δ RSS':>8}")
+    print("-" * 82)
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['stage']:<10} {row['scale']:>6g}  ❌ {row['error']}")
+            continue
+        change = lambda v: f"{v:+.0%}" if v is not None else '-'
+        flag = '  ⚠️ regression' if row['regression'] else ''
+        print(f"{row['stage']:<10} {row['scale']:>6g} {row['rows']:>12,} {row['seconds']:>9.2f} "
+              f"{row['rows_per_s']:>12,.0f} {row['peak_rss_mb']:>9.0f} {change(row['time_change']):>8} "
+              f"{change(row['rss_change']):>8}{flag}")
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data and track regressions.")
+    parser.add_argument("--scales", type=float, nargs='+', default=[1, 10],
+                        help="Data sizes as multiples of the LF sample (see synthetic_data.py)")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--models", nargs='+', help="Models for the train stage (default: all candidate_models)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Workers / thread budget (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="ETL chunk size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Keep the generated data here and reuse it (default: temporary)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history of the runs")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown / memory growth flagged")
+    parser.add_argument("--set-baseline", action="store_true", help="Use this run as the baseline from now on")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with code 1 on regressions")
+    parser.add_argument("--label", help="Free-text note stored with the run")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the output of the stages")
+    args = parser.parse_args()
+
+    options = {'jobs': args.jobs, 'chunksize': args.chunksize, 'models': args.models, 'verbose': args.verbose}
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='pipeline_bench_')
+    stages = [s for s in STAGES if s in args.stages]
+
+    print("⏱️ PIPELINE BENCHMARK")
+    print("=" * 82)
+    results = []
+    try:
+        for scale in args.scales:
+            data_dir, manifest = prepare_data(work_dir, scale, args.seed, args.jobs or os.cpu_count(), stages,
+                                              args.chunksize)
+            for stage in stages:
+                runs = [run_isolated(stage, data_dir, manifest, options) for _ in range(args.repeat)]
+                ok = [r for r in runs if 'error' not in r]
+                result = {'stage': stage, 'scale': scale}
+                if ok:
+                    best = min(ok, key=lambda r: r['seconds'])
+                    result.update(rows=best['rows'], seconds=round(best['seconds'], 3),
+                                  rows_per_s=round(best['rows'] / best['seconds'], 1),
+                                  peak_rss_mb=round(min(r['peak_rss_mb'] for r in ok), 1))
+                    print(f"   {stage} @ {scale:g}: {result['seconds']:.2f}s, {result['peak_rss_mb']:.0f} MB")
+                else:
+                    result['error'] = runs[0]['error']
+                    print(f"   {stage} @ {scale:g}: ❌ {result['error']}")
+                results.append(result)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    config = {'scales': args.scales, 'stages': stages, 'repeat': args.repeat, 'models': args.models,
+              'jobs': args.jobs, 'chunksize': args.chunksize, 'seed': args.seed}
+    history = load_history(args.history)
+    baseline = baseline_run(history, config)
+    mismatch = config_mismatch(config, baseline) if baseline else []
+    if mismatch:
+        print(f"\n⚠️ Baseline run {baseline['id']} used different {', '.join(mismatch)}; not compared")
+        baseline = None
+    rows = compare(results, baseline, args.threshold)
+    print_report(rows, baseline, args.threshold)
+    if baseline and baseline.get('host', {}).get('node') != platform.node():
+        print(f"⚠️ Baseline was measured on {baseline['host'].get('node')}; timings are not directly comparable")
+
+    run = {
+        'id': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'host': host_info(),
+        'config': config,
+        'results': results,
+    }
+    history['runs'].append(run)
+    if args.set_baseline:
+        history['baseline'] = run['id']
+    save_history(args.history, history)
+    print(f"\n✅ Saved run {run['id']} to {args.history}"
+          + (" (baseline)" if history['baseline'] == run['id'] else ""))
+
+    regressions = [r for r in rows if r['regression']]
+    if regressions:
+        print(f"⚠️ {len(regressions)} regression(s) above {args.threshold:.0%}: "
+              + ', '.join(f"{r['stage']}@{r['scale']:g}" for r in regressions))
+    if args.fail_on_regression and (regressions or any('error' in r for r in results)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()